@@ -1,11 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+import argparse
 import sqlite3
+import string
 from datetime import datetime
 import os
 import sys
+import tempfile
+import bisect
+import hashlib
+import hmac
+import json
 import logging
-from functools import wraps
+import queue
+import threading
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from pathlib import Path
 
 # Set up logging
 logging.basicConfig(
@@ -15,58 +26,624 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def to_sentence_case(text):
-    """Convert text to sentence case (first letter capitalized, rest lowercase)"""
-    if not text:
-        return text
-    return text[0].upper() + text[1:].lower()
-
 def format_name(name):
     """Format names in sentence case, handling multiple words"""
     if not name:
         return name
-    return ' '.join(to_sentence_case(word) for word in name.split())
+    # capwords does the split/capitalize/join in one call with the same result
+    return string.capwords(name)
+
+MONTH_ABBREVIATIONS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+@lru_cache(maxsize=4096)
+def format_display_date(date_str):
+    """Format a stored YYYY-MM-DD[ HH:MM:SS] date as DD-Mon-YYYY for display"""
+    try:
+        year, month, day = date_str[:4], date_str[5:7], date_str[8:10]
+        # Splice the fixed layout directly; days past 28 need strptime's calendar check
+        if (date_str[4:5] == '-' and date_str[7:8] == '-' and len(date_str) in (10, 19)
+                and (year + month + day).isdigit() and 1 <= int(month) <= 12 and 1 <= int(day) <= 28):
+            return f"{day}-{MONTH_ABBREVIATIONS[int(month) - 1]}-{year}"
+        return datetime.strptime(date_str[:10], "%Y-%m-%d").strftime("%d-%b-%Y")
+    except:
+        return date_str or "N/A"
+
+@lru_cache(maxsize=64)
+def split_gst_slab(slab_text):
+    """Return (half rate, half rate as a 2-place string) for a GST slab string, or None if it isn't a number"""
+    try:
+        half = float(slab_text) / 2
+    except ValueError:
+        return None
+    return half, f"{half:.2f}"
+
+PASSWORD_SCHEME = 'scrypt'
+
+NO_COMPANY_ID = 0
+NO_COMPANY_NAME = 'No Company'
+
+# Hot statements kept as module constants so the per-connection statement cache always hits
+SQL_GET_PRODUCTS = '''
+    SELECT 
+        c.name, 
+        p.brand, 
+        p.product_name, 
+        SUM(p.quantity) as total_quantity,
+        p.unit_price, 
+        p.cgst, 
+        p.sgst, 
+        p.cess, 
+        MAX(COALESCE(p.purchase_date, '')) as last_purchase_date
+    FROM products p
+    JOIN companies c ON p.company_id = c.id
+    GROUP BY p.product_name, p.brand, p.company_id, p.unit_price, p.cgst, p.sgst, p.cess
+    ORDER BY p.product_name, p.brand, p.company_id, p.unit_price, p.cgst, p.sgst, p.cess
+'''
+
+# Same grouping as SQL_GET_PRODUCTS over the batches picked by the {matching} subquery;
+# every searched column is a group key, so a group always matches as a whole
+SQL_SEARCH_PRODUCTS = '''
+    SELECT 
+        c.name, 
+        p.brand, 
+        p.product_name, 
+        SUM(p.quantity) as total_quantity,
+        p.unit_price, 
+        p.cgst, 
+        p.sgst, 
+        p.cess, 
+        MAX(COALESCE(p.purchase_date, '')) as last_purchase_date
+    FROM products p
+    JOIN companies c ON p.company_id = c.id
+    WHERE p.id IN ({matching})
+    GROUP BY p.product_name, p.brand, p.company_id, p.unit_price, p.cgst, p.sgst, p.cess
+    ORDER BY p.product_name, p.brand, p.company_id, p.unit_price, p.cgst, p.sgst, p.cess
+'''
+
+SQL_INSERT_PRODUCT = '''
+    INSERT INTO products 
+    (company_id, brand, product_name, original_quantity, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice, is_current)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+'''
+
+SQL_INSERT_BILL_ITEM = '''
+    INSERT INTO bill_items (bill_number, product_name, quantity, unit_price)
+    VALUES (?, ?, ?, ?)
+'''
+
+SQL_AVAILABLE_STOCK = '''
+    SELECT product_name, SUM(quantity)
+    FROM products 
+    WHERE product_name IN (SELECT value FROM json_each(?)) AND quantity > 0
+    GROUP BY product_name
+'''
+
+# FIFO deduction: zero out fully consumed batches, trim the batch where the request runs out
+SQL_DEDUCT_STOCK_FIFO = '''
+    WITH requested AS (
+        SELECT key AS product_name, value AS quantity
+        FROM json_each(:requested)
+    ),
+    ordered AS (
+        SELECT 
+            p.id,
+            p.quantity,
+            r.quantity AS requested,
+            SUM(p.quantity) OVER (PARTITION BY p.product_name ORDER BY p.purchase_date, p.id) AS running
+        FROM products p
+        JOIN requested r ON p.product_name = r.product_name
+        WHERE p.quantity > 0
+    )
+    UPDATE products
+    SET quantity = CASE
+        WHEN ordered.running <= ordered.requested THEN 0
+        ELSE ordered.running - ordered.requested
+    END
+    FROM ordered
+    WHERE products.id = ordered.id
+      AND ordered.running - ordered.quantity < ordered.requested
+'''
+
+SQL_PRODUCT_STOCK = '''
+    SELECT product_name, cgst, sgst, SUM(quantity) AS total_quantity
+    FROM products
+    {where}
+    GROUP BY product_name, cgst, sgst
+'''
+
+SQL_STOCK_SUMMARY = '''
+    SELECT product_name, total_stock, unit_price
+    FROM products_summary
+    ORDER BY product_name
+'''
+
+SQL_PURCHASE_HISTORY = '''
+    SELECT 
+        p.id,
+        c.name as company_name,
+        p.brand,
+        p.product_name,
+        p.original_quantity,
+        p.quantity as remaining_quantity,
+        (p.original_quantity - p.quantity) as sold_quantity,
+        printf('%.2f', p.unit_price),
+        p.purchase_date,
+        COALESCE(p.company_invoice, '')
+    FROM products p
+    JOIN companies c ON p.company_id = c.id
+    {where}
+    ORDER BY p.purchase_date DESC
+'''
+
+# Purchase history query per filter type, built once so each keeps one cached statement
+PURCHASE_FILTER_SQL = {
+    "All": SQL_PURCHASE_HISTORY.format(where=""),
+    "Product": SQL_PURCHASE_HISTORY.format(where="WHERE p.product_name LIKE ?"),
+    "Company": SQL_PURCHASE_HISTORY.format(where="WHERE c.name LIKE ?"),
+    "Invoice": SQL_PURCHASE_HISTORY.format(where="WHERE p.company_invoice LIKE ?"),
+}
+
+STATEMENT_CACHE_SIZE = 256
+
+# Treeview row tags, built once and shared by every inserted row
+LOW_STOCK_TAGS = ('low_stock',)
+NO_TAGS = ()
+
+# Keys that never change an entry's text, ignored by the keystroke handlers
+NAVIGATION_KEYS = frozenset((
+    'Escape', 'Return', 'Tab', 'Up', 'Down', 'Left', 'Right',
+    'Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R',
+    'Caps_Lock', 'Meta_L', 'Meta_R', 'Super_L', 'Super_R'
+))
+
+def format_stock_report_row(product):
+    """Format a get_products() row for the stock report"""
+    return (
+        product[0],  # Company
+        product[1],  # Brand
+        product[2],  # Product
+        product[3],  # Quantity
+        f"₹{product[4]:.2f}",  # Price
+        f"{product[5]}%",  # CGST
+        f"{product[6]}%",  # SGST
+        format_display_date(product[8])  # Purchase Date
+    )
+
+def format_sales_report_row(sale):
+    """Format a billing row for the sales report; the amount comes back formatted by SQLite"""
+    return (
+        sale[0],  # Invoice No
+        sale[1],  # Customer
+        format_display_date(sale[2]),
+        sale[3]
+    )
+
+# Tcl helper inserting a whole list of rows into a Treeview, so a batch costs one call into Tcl
+TCL_INSERT_ROWS = '''
+proc stashboard_insert_rows {tree rows} {
+    foreach row $rows {
+        $tree insert {} end -values $row
+    }
+}
+'''
+
+# Tcl helper giving each Treeview column its heading, width and anchor in one call
+TCL_SETUP_COLUMNS = '''
+proc stashboard_setup_columns {tree columns} {
+    foreach column $columns {
+        lassign $column name width anchor
+        $tree heading $name -text $name
+        $tree column $name -width $width -anchor $anchor
+    }
+}
+'''
+
+# Run against a tmpfs copy of the database and write it back after imports; set from --fast-import in main()
+FAST_IMPORT = False
+
+def hash_password(password):
+    """Hash a password with a random salt using scrypt, returning 'scrypt$<salt>$<hash>'"""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1)
+    return f"{PASSWORD_SCHEME}${salt.hex()}${digest.hex()}"
+
+def verify_password(stored, password):
+    """Check a password against a stored hash (or legacy plaintext) in constant time"""
+    if not stored:
+        return False
+    if not stored.startswith(f"{PASSWORD_SCHEME}$"):
+        return hmac.compare_digest(stored.encode(), password.encode())
+    _, salt_hex, digest_hex = stored.split('$')
+    digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt_hex), n=2**14, r=8, p=1)
+    return hmac.compare_digest(digest.hex(), digest_hex)
+
+def is_password_hashed(stored):
+    """Tell whether a stored password is already in the hashed format"""
+    return bool(stored) and stored.startswith(f"{PASSWORD_SCHEME}$")
 
 # Database Handler Class
 class DatabaseHandler:
     _instance = None
+    READ_POOL_SIZE = 3
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.connection = sqlite3.connect(get_db_path())
-            cls._instance.connection.execute("PRAGMA foreign_keys = ON")
-            cls._instance.connection.row_factory = sqlite3.Row
+            cls._instance._open_connections()
         return cls._instance
+
+    def _open_connections(self):
+        """Open the single writer connection and the pool of read-only connections"""
+        db_path = get_db_path()
+        if FAST_IMPORT and os.path.exists(get_persistent_db_path()):
+            copy_database(get_persistent_db_path(), db_path)
+        # Autocommit at the driver level; writes open explicit BEGIN IMMEDIATE transactions
+        self.connection = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            self.connection.set_trace_callback(logger.debug)
+        configure_connection(self.connection, db_path)
+        self.connection.row_factory = sqlite3.Row
+        self._write_lock = threading.RLock()
+        self.ensure_schema()
+        # Gather statistics only for tables that lack them or changed a lot; the rest waits for close()
+        self.connection.execute("PRAGMA optimize=0x10002")
+        # (year, last_invoice_number) held in memory, persisted alongside each bill
+        self._invoice_state = None
+        self._invoice_previous = None
+        # Lookup lists that only change through this handler, loaded on first use
+        self._companies_cache = None
+        self._customers_cache = None
+        self._gst_slabs_cache = None
+
+        self._read_pool = queue.Queue()
+        for _ in range(self.READ_POOL_SIZE):
+            reader = sqlite3.connect(
+                f"{Path(db_path).as_uri()}?mode=ro", uri=True, check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
+            configure_connection(reader, db_path, read_only=True)
+            reader.row_factory = sqlite3.Row
+            self._read_pool.put(reader)
+    
+    @contextmanager
+    def get_read_cursor(self):
+        """Check out a read-only connection from the pool for the duration of the block"""
+        reader = self._read_pool.get()
+        try:
+            yield reader.cursor()
+        finally:
+            self._read_pool.put(reader)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in a BEGIN IMMEDIATE transaction on the writer, committing or rolling back"""
+        with self._write_lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
     
-    def get_cursor(self):
-        return self.connection.cursor()
-    
-    def commit(self):
-        self.connection.commit()
+    def checkpoint(self, mode="PASSIVE"):
+        """Checkpoint the WAL into the main database file and log (busy, log, checkpointed)"""
+        with self._write_lock:
+            busy, log_frames, checkpointed = self.connection.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        logger.info(f"WAL checkpoint ({mode}): busy={busy}, log={log_frames}, checkpointed={checkpointed}")
+        return busy, log_frames, checkpointed
     
     def close(self):
         if self.connection:
+            with self.transaction() as cursor:
+                self._persist_invoice_number(cursor)
+            # Re-ANALYZE only the tables whose statistics went stale this session
+            with self._write_lock:
+                self.connection.execute("PRAGMA optimize")
+            self.checkpoint("TRUNCATE")
+            self.persist_fast_import()
             self.connection.close()
+            while not self._read_pool.empty():
+                self._read_pool.get_nowait().close()
             DatabaseHandler._instance = None
 
+    def ensure_schema(self):
+        """Create tables, indexes and default rows on the writer connection"""
+        logger.info(f"Initializing database at: {get_db_path()}")
+
+        # One transaction for the whole schema pass instead of one commit per statement
+        with self.transaction() as cursor:
+            # Create tables if they don't exist
+            tables = {
+                'companies': '''
+                    CREATE TABLE IF NOT EXISTS companies (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT,
+                        gst_number TEXT,
+                        contact TEXT
+                    )
+                ''',
+                'customers': '''
+                    CREATE TABLE IF NOT EXISTS customers (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT,
+                        address TEXT,
+                        gst_number TEXT,
+                        contact TEXT
+                    )
+                ''',
+                'products': '''
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY,
+                    company_id INTEGER DEFAULT 0,
+                    brand TEXT COLLATE NOCASE,
+                    product_name TEXT COLLATE NOCASE,
+                    original_quantity INTEGER,  
+                    quantity INTEGER,           
+                    unit_price REAL,
+                    cgst REAL,
+                    sgst REAL,
+                    cess REAL,
+                    purchase_date TEXT,
+                    company_invoice TEXT,
+                    is_current INTEGER DEFAULT 1,
+                    FOREIGN KEY (company_id) REFERENCES companies (id)
+                )
+                ''',
+                'gst_slabs': '''
+                    CREATE TABLE IF NOT EXISTS gst_slabs (
+                        id INTEGER PRIMARY KEY,
+                        gst_rate REAL
+                    )
+                ''',
+                'settings': '''
+                    CREATE TABLE IF NOT EXISTS settings (
+                        year INTEGER PRIMARY KEY,
+                        last_invoice_number INTEGER
+                        low_stock_threshold INTEGER DEFAULT 5
+                    )
+                ''',
+                'purchases': '''
+                    CREATE TABLE IF NOT EXISTS purchases (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        transaction_id TEXT,
+                        product_name TEXT,
+                        quantity INTEGER,
+                        unit_price REAL,
+                        total_price REAL,
+                        purchase_date DATETIME
+                    )
+                ''',
+                'bill_items': '''
+                    CREATE TABLE IF NOT EXISTS bill_items (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        bill_number INTEGER,
+                        product_name TEXT,
+                        quantity INTEGER,
+                        unit_price REAL,
+                        FOREIGN KEY (bill_number) REFERENCES billing(bill_number)
+                    )
+                ''',
+                'billing': '''
+                    CREATE TABLE IF NOT EXISTS billing (
+                        bill_number INTEGER PRIMARY KEY,
+                        customer_name TEXT,
+                        total_amount REAL,
+                        bill_date TEXT,
+                        customer_address TEXT
+                    )
+                ''',
+                'users': '''
+                    CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY,
+                        username TEXT UNIQUE,
+                        password TEXT,
+                        role TEXT
+                    )
+                '''
+            }
+
+            for table_name, table_sql in tables.items():
+                cursor.execute(table_sql)
+                logger.info(f"Created table {table_name} or it already exists.")
+
+            # Check and add low_stock_threshold column if it doesn't exist
+            cursor.execute("PRAGMA table_info(settings)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'low_stock_threshold' not in columns:
+                cursor.execute("ALTER TABLE settings ADD COLUMN low_stock_threshold INTEGER DEFAULT 5")
+                logger.info("Added low_stock_threshold column to settings table")
+
+            # Check and add customer_address column to billing if it doesn't exist
+            cursor.execute("PRAGMA table_info(billing)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'customer_address' not in columns:
+                cursor.execute("ALTER TABLE billing ADD COLUMN customer_address TEXT")
+                logger.info("Added customer_address column to billing table")
+
+            # Create indexes for the hot lookup, join and sort paths
+            indexes = {
+                'idx_products_company': '''
+                    CREATE INDEX IF NOT EXISTS idx_products_company
+                    ON products (company_id)
+                ''',
+                'idx_products_brand': '''
+                    CREATE INDEX IF NOT EXISTS idx_products_brand
+                    ON products (brand)
+                ''',
+                'idx_products_group': '''
+                    CREATE INDEX IF NOT EXISTS idx_products_group
+                    ON products (product_name, brand, company_id, unit_price, cgst, sgst, cess, purchase_date, quantity)
+                ''',
+                'idx_bill_items_bill': '''
+                    CREATE INDEX IF NOT EXISTS idx_bill_items_bill
+                    ON bill_items (bill_number, product_name, quantity, unit_price)
+                ''',
+                'idx_bill_items_product': '''
+                    CREATE INDEX IF NOT EXISTS idx_bill_items_product
+                    ON bill_items (product_name, quantity, unit_price)
+                ''',
+                'idx_billing_date': '''
+                    CREATE INDEX IF NOT EXISTS idx_billing_date
+                    ON billing (bill_date)
+                ''',
+                'idx_products_date': '''
+                    CREATE INDEX IF NOT EXISTS idx_products_date
+                    ON products (purchase_date DESC)
+                '''
+            }
+
+            for index_name, index_sql in indexes.items():
+                cursor.execute(index_sql)
+                logger.info(f"Created index {index_name} or it already exists.")
+
+            # Indexes of earlier versions: idx_products_group leads with product_name and covers quantity,
+            # and the invoice lookups idx_products_invoice served are gone
+            for index_name in ('idx_products_name_date', 'idx_products_active', 'idx_products_invoice'):
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+            # Stock totals per product name and price, loaded into the billing stock cache
+            cursor.execute('''
+                CREATE VIEW IF NOT EXISTS products_summary AS
+                SELECT product_name, SUM(quantity) AS total_stock, unit_price
+                FROM products
+                GROUP BY product_name, unit_price
+            ''')
+
+            # Unique names let add_company/add_customer skip duplicates in one statement;
+            # older files that already hold duplicates keep working without the index
+            for table_name in ('companies', 'customers'):
+                try:
+                    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table_name}_name ON {table_name} (name COLLATE NOCASE)")
+                except sqlite3.IntegrityError:
+                    logger.warning(f"Duplicate names found in {table_name}; unique name index not created")
+
+            # Sentinel company for products without one, so joins can be INNER joins.
+            # A "No Company" row the user created earlier becomes the sentinel (id 0),
+            # and its products move with it; deferred FK checks allow the re-keying
+            cursor.execute("SELECT id FROM companies WHERE name = ? COLLATE NOCASE ORDER BY id", (NO_COMPANY_NAME,))
+            stale_ids = [row[0] for row in cursor.fetchall() if row[0] != NO_COMPANY_ID]
+            if stale_ids:
+                cursor.execute("PRAGMA defer_foreign_keys = ON")
+                cursor.execute("SELECT 1 FROM companies WHERE id = ?", (NO_COMPANY_ID,))
+                if cursor.fetchone() is None:
+                    cursor.execute("UPDATE companies SET id = ? WHERE id = ?", (NO_COMPANY_ID, stale_ids[0]))
+                cursor.execute(
+                    "UPDATE products SET company_id = ? WHERE company_id IN (SELECT value FROM json_each(?))",
+                    (NO_COMPANY_ID, json.dumps(stale_ids))
+                )
+                cursor.execute("DELETE FROM companies WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(stale_ids),))
+                logger.info(f"Merged {NO_COMPANY_NAME} company ids {stale_ids} into id {NO_COMPANY_ID}")
+            cursor.execute("INSERT OR IGNORE INTO companies (id, name) VALUES (?, ?)", (NO_COMPANY_ID, NO_COMPANY_NAME))
+            cursor.execute("UPDATE products SET company_id = ? WHERE company_id IS NULL", (NO_COMPANY_ID,))
+
+            # Full-text index over product, brand and company names, kept in sync by triggers
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_fts'")
+            fts_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+                USING fts5(product_name, brand, company_name, tokenize='unicode61')
+            ''')
+            fts_triggers = {
+                'products_fts_insert': '''
+                    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                        INSERT INTO products_fts (rowid, product_name, brand, company_name)
+                        VALUES (new.id, new.product_name, new.brand,
+                                (SELECT name FROM companies WHERE id = new.company_id));
+                    END
+                ''',
+                'products_fts_update': '''
+                    CREATE TRIGGER IF NOT EXISTS products_fts_update
+                    AFTER UPDATE OF product_name, brand, company_id ON products BEGIN
+                        DELETE FROM products_fts WHERE rowid = old.id;
+                        INSERT INTO products_fts (rowid, product_name, brand, company_name)
+                        VALUES (new.id, new.product_name, new.brand,
+                                (SELECT name FROM companies WHERE id = new.company_id));
+                    END
+                ''',
+                'products_fts_delete': '''
+                    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                        DELETE FROM products_fts WHERE rowid = old.id;
+                    END
+                ''',
+                'companies_fts_rename': '''
+                    CREATE TRIGGER IF NOT EXISTS companies_fts_rename AFTER UPDATE OF name ON companies BEGIN
+                        UPDATE products_fts SET company_name = new.name
+                        WHERE rowid IN (SELECT id FROM products WHERE company_id = new.id);
+                    END
+                '''
+            }
+            for trigger_name, trigger_sql in fts_triggers.items():
+                cursor.execute(trigger_sql)
+                logger.info(f"Created trigger {trigger_name} or it already exists.")
+            if not fts_exists:
+                cursor.execute('''
+                    INSERT INTO products_fts (rowid, product_name, brand, company_name)
+                    SELECT p.id, p.product_name, p.brand, c.name
+                    FROM products p
+                    JOIN companies c ON p.company_id = c.id
+                ''')
+                logger.info("Populated products_fts from existing products")
+
+            # Initialize settings for current year
+            current_year = datetime.now().year
+            cursor.execute("INSERT OR IGNORE INTO settings (year, last_invoice_number) VALUES (?, ?)", (current_year, 0))
+
+            # Create default admin user if not exists
+            cursor.execute("SELECT COUNT(*) FROM users WHERE username='admin'")
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(
+                    "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                    ('admin', hash_password('admin123'), 'admin')
+                )
+                logger.info("Created default admin user")
+
     # Company operations
     def get_companies(self):
-        cursor = self.get_cursor()
-        cursor.execute("SELECT id, name FROM companies")
-        return {name: id for id, name in cursor.fetchall()}
+        if self._companies_cache is None:
+            with self.get_read_cursor() as cursor:
+                cursor.execute("SELECT id, name FROM companies")
+                self._companies_cache = {name: id for id, name in cursor.fetchall()}
+        return self._companies_cache
     
     def add_company(self, name, gst_number, contact):
-        cursor = self.get_cursor()
-        cursor.execute(
-            "INSERT INTO companies (name, gst_number, contact) VALUES (?, ?, ?)",
-            (format_name(name), gst_number, contact)
-        )
-        self.commit()
+        """Insert a company, or update the GST number and contact of the one with the same name, returning its id"""
+        name = format_name(name)
+        with self.transaction() as cursor:
+            try:
+                cursor.execute('''
+                    INSERT INTO companies (name, gst_number, contact) VALUES (?, ?, ?)
+                    ON CONFLICT (name COLLATE NOCASE) DO UPDATE
+                    SET gst_number = excluded.gst_number, contact = excluded.contact
+                    RETURNING id, name
+                ''', (name, gst_number, contact))
+            except sqlite3.OperationalError:
+                # Files holding duplicate names have no unique name index to upsert against
+                cursor.execute(
+                    "INSERT INTO companies (name, gst_number, contact) VALUES (?, ?, ?) RETURNING id, name",
+                    (name, gst_number, contact)
+                )
+            # Drain the RETURNING statement so the transaction can commit
+            company_id, stored_name = cursor.fetchall()[0]
+        if self._companies_cache is not None:
+            self._companies_cache[stored_name] = company_id
+        return company_id
+
+    def _insert_or_get_id(self, cursor, insert_sql, params, lookup_sql, name):
+        """Run an INSERT OR IGNORE ... RETURNING id, falling back to a lookup when the row already existed"""
+        cursor.execute(insert_sql, params)
+        # Drain the RETURNING statement so the transaction can commit
+        row = next(iter(cursor.fetchall()), None)
+        if row is None:
+            cursor.execute(lookup_sql, (name,))
+            row = cursor.fetchone()
+        return row[0]
 
     def get_purchase_history(self, product_name=None):
         """Get complete purchase history with original and remaining quantities"""
-        cursor = self.get_cursor()
         query = '''
             SELECT 
                 p.id,
@@ -83,7 +660,7 @@ class DatabaseHandler:
                 p.company_invoice,
                 (p.original_quantity - p.quantity) as sold_quantity
             FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
+            JOIN companies c ON p.company_id = c.id
         '''
         params = []
         
@@ -92,198 +669,304 @@ class DatabaseHandler:
             params.append(product_name)
         
         query += " ORDER BY p.purchase_date DESC"
-        cursor.execute(query, params)
-        return cursor.fetchall()
+        with self.get_read_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
     
     # Product operations
     def get_products(self):
-        cursor = self.get_cursor()
-        cursor.execute('''
-            SELECT 
-                COALESCE(c.name, 'No Company'), 
-                p.brand, 
-                p.product_name, 
-                SUM(p.quantity) as total_quantity,
-                p.unit_price, 
-                p.cgst, 
-                p.sgst, 
-                p.cess, 
-                MAX(COALESCE(p.purchase_date, '')) as last_purchase_date
-            FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
-            GROUP BY c.name, p.brand, p.product_name, p.unit_price, p.cgst, p.sgst, p.cess
-            ORDER BY p.product_name
-        ''')
-        return [tuple(row) for row in cursor.fetchall()]
+        with self.get_read_cursor() as cursor:
+            # Plain tuples straight from the C layer; Treeview needs real sequences
+            cursor.row_factory = None
+            cursor.execute(SQL_GET_PRODUCTS)
+            return cursor.fetchall()
+
+    def get_total_stock_value(self):
+        """Return the value of all stock on hand, summed inside SQLite"""
+        with self.get_read_cursor() as cursor:
+            cursor.execute("SELECT TOTAL(quantity * unit_price) FROM products")
+            return cursor.fetchone()[0]
+
+    def get_product_stock(self, product_name=None):
+        """Return {lowercased product_name: {'total_quantity', 'cgst', 'sgst'}} for one product or all of them"""
+        with self.get_read_cursor() as cursor:
+            # Unpacked by position; Row lookups by name cost a scan of the column names each
+            cursor.row_factory = None
+            if product_name is None:
+                cursor.execute(SQL_PRODUCT_STOCK.format(where=""))
+            else:
+                cursor.execute(SQL_PRODUCT_STOCK.format(where="WHERE product_name = ?"), (product_name,))
+            stock = {}
+            for name, cgst, sgst, total_quantity in cursor:
+                # Keyed case-insensitively like the NOCASE column; keep the first tax group per name
+                key = name.lower()
+                if key not in stock:
+                    stock[key] = {'total_quantity': total_quantity, 'cgst': cgst, 'sgst': sgst}
+            return stock
+
+    def get_stock_summary(self):
+        """Return (product_name, total_stock, unit_price) tuples for every product and price"""
+        with self.get_read_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute(SQL_STOCK_SUMMARY)
+            return cursor.fetchall()
+    
+    def search_products(self, search_term, contains=False):
+        """Search products by name, brand or company, grouped like get_products, using the full-text index where possible"""
+        tokens = search_term.split()
+        with self.get_read_cursor() as cursor:
+            cursor.row_factory = None
+            # Terms with nothing the tokenizer can index (e.g. pure punctuation) fall back to LIKE
+            if not contains and tokens and all(any(ch.isalnum() for ch in token) for token in tokens):
+                match = ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+                cursor.execute(SQL_SEARCH_PRODUCTS.format(matching='''
+                    SELECT rowid FROM products_fts WHERE products_fts MATCH ?
+                '''), (match,))
+            else:
+                # Anchored prefixes can range-scan the NOCASE indexes; substrings need a full scan
+                escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                pattern = f'%{escaped}%' if contains else f'{escaped}%'
+                cursor.execute(SQL_SEARCH_PRODUCTS.format(matching='''
+                    -- One index range scan per column instead of a scan of the join
+                    SELECT id FROM products WHERE product_name LIKE ? ESCAPE '\\'
+                    UNION
+                    SELECT id FROM products WHERE brand LIKE ? ESCAPE '\\'
+                    UNION
+                    SELECT p2.id FROM companies c2
+                    JOIN products p2 ON p2.company_id = c2.id
+                    WHERE c2.name LIKE ? ESCAPE '\\'
+                '''), (pattern, pattern, pattern))
+            return cursor.fetchall()
     
     def get_product_history(self, product_name):
-        cursor = self.get_cursor()
-        cursor.execute('''
-            SELECT 
-                p.brand, 
-                p.product_name, 
-                p.quantity, 
-                p.unit_price, 
-                p.purchase_date,
-                p.company_invoice,
-                c.name as company_name
-            FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
-            WHERE LOWER(p.product_name) = LOWER(?)
-            ORDER BY p.purchase_date DESC
-        ''', (product_name,))
-        return cursor.fetchall()
+        with self.get_read_cursor() as cursor:
+            cursor.execute('''
+                SELECT 
+                    p.brand, 
+                    p.product_name, 
+                    p.quantity, 
+                    p.unit_price, 
+                    p.purchase_date,
+                    p.company_invoice,
+                    c.name as company_name
+                FROM products p
+                JOIN companies c ON p.company_id = c.id
+                WHERE p.product_name = ?  -- NOCASE collation keeps this case-insensitive and index-seekable
+                ORDER BY p.purchase_date DESC
+            ''', (product_name,))
+            return cursor.fetchall()
     
     def add_product(self, company_id, brand, product_name, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice=None):
-        cursor = self.get_cursor()
-        brand = format_name(brand)
-        product_name = format_name(product_name)
-
-        cursor.execute('''
-            INSERT INTO products 
-            (company_id, brand, product_name, original_quantity, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice, is_current)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-        ''', (company_id, brand, product_name, quantity, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice))
-        self.commit()
-
-        def update_product_quantity(self, product_id, new_quantity, purchase_date):
-            cursor = self.get_cursor()
-            cursor.execute('''
-                UPDATE products 
-                SET quantity = ?, purchase_date = ?
-                WHERE id = ?
-            ''', (new_quantity, purchase_date, product_id))
-            self.commit()
+        self.add_products_bulk([
+            (company_id, brand, product_name, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice)
+        ])
+
+    def add_products_bulk(self, rows):
+        """Insert many (company_id, brand, product_name, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice) rows in one transaction"""
+        formatted_rows = [
+            (NO_COMPANY_ID if company_id is None else company_id, format_name(brand), format_name(product_name), quantity, quantity,
+             unit_price, cgst, sgst, cess, purchase_date, company_invoice)
+            for company_id, brand, product_name, quantity, unit_price, cgst, sgst, cess, purchase_date, company_invoice in rows
+        ]
+
+        with self.transaction() as cursor:
+            cursor.executemany(SQL_INSERT_PRODUCT, formatted_rows)
+
+    def persist_fast_import(self):
+        """Write the tmpfs database back to its on-disk location when running with --fast-import"""
+        if not FAST_IMPORT:
+            return
+        disk_path = get_persistent_db_path()
+        staging_path = f"{disk_path}.import"
+        with self._write_lock:
+            copy_database(get_db_path(), staging_path)
+            # Stale WAL/SHM files from an earlier disk session must not be replayed over the new file
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(disk_path + suffix):
+                    os.remove(disk_path + suffix)
+            os.replace(staging_path, disk_path)
+        logger.info(f"Fast-import database written back to {disk_path}")
 
     # Customer operations
     def get_customers(self):
-        cursor = self.get_cursor()
-        cursor.execute("SELECT name FROM customers ORDER BY name")
-        return [row[0] for row in cursor.fetchall()]
+        if self._customers_cache is None:
+            with self.get_read_cursor() as cursor:
+                cursor.execute("SELECT name FROM customers ORDER BY name")
+                self._customers_cache = [row[0] for row in cursor.fetchall()]
+        return self._customers_cache
     
     def add_customer(self, name, address, gst_number, contact):
-        cursor = self.get_cursor()
-        cursor.execute('''
-            INSERT INTO customers (name, address, gst_number, contact)
-            VALUES (?, ?, ?, ?)
-        ''', (format_name(name), address, gst_number, contact))
-        self.commit()
+        """Insert a customer unless one with the same name exists, returning its id"""
+        name = format_name(name)
+        with self.transaction() as cursor:
+            customer_id = self._insert_or_get_id(
+                cursor,
+                '''
+                    INSERT OR IGNORE INTO customers (name, address, gst_number, contact)
+                    VALUES (?, ?, ?, ?)
+                    RETURNING id
+                ''',
+                (name, address, gst_number, contact),
+                "SELECT id FROM customers WHERE name = ? COLLATE NOCASE",
+                name
+            )
+        if self._customers_cache is not None and name not in self._customers_cache:
+            bisect.insort(self._customers_cache, name)
+        return customer_id
     
     def get_customer_address(self, name):
-        cursor = self.get_cursor()
-        cursor.execute("SELECT address FROM customers WHERE name=?", (name,))
-        result = cursor.fetchone()
+        with self.get_read_cursor() as cursor:
+            cursor.execute("SELECT address FROM customers WHERE name=?", (name,))
+            result = cursor.fetchone()
         return result[0] if result else ""
 
     # Billing operations
-    def create_bill(self, bill_number, customer_name, total_amount, bill_date):
-        cursor = self.get_cursor()
-        cursor.execute('''
-            INSERT INTO billing (bill_number, customer_name, total_amount, bill_date)
-            VALUES (?, ?, ?, ?)
-        ''', (bill_number, customer_name, total_amount, bill_date))
-        self.commit()
+    def create_bill(self, bill_number, customer_name, total_amount, bill_date, items=None):
+        """Insert the bill and its (bill_number, product_name, quantity, unit_price) items and deduct their stock in one transaction, returning the customer address stored on it"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO billing (bill_number, customer_name, total_amount, bill_date, customer_address)
+                SELECT ?, ?, ?, ?, (SELECT address FROM customers WHERE name = ?)
+                RETURNING customer_address
+            ''', (bill_number, customer_name, total_amount, bill_date, customer_name))
+            address = cursor.fetchall()[0][0]
+            if items:
+                cursor.executemany(SQL_INSERT_BILL_ITEM, items)
+                requested = {}
+                spellings = {}
+                for _, product_name, quantity, _ in items:
+                    # Names match case-insensitively, so one spelling stands for each product
+                    product_name = spellings.setdefault(product_name.lower(), product_name)
+                    requested[product_name] = requested.get(product_name, 0) + quantity
+                self._deduct_stock(cursor, requested)
+            self._persist_invoice_number(cursor)
+        return address or ""
+
+    def add_bill_items(self, rows):
+        """Insert many (bill_number, product_name, quantity, unit_price) rows with a single commit"""
+        with self.transaction() as cursor:
+            cursor.executemany(SQL_INSERT_BILL_ITEM, rows)
     
     def add_bill_item(self, bill_number, product_name, quantity, unit_price):
-        cursor = self.get_cursor()
-        cursor.execute('''
-            INSERT INTO bill_items (bill_number, product_name, quantity, unit_price)
-            VALUES (?, ?, ?, ?)
-        ''', (bill_number, product_name, quantity, unit_price))
-        self.commit()
+        self.add_bill_items([(bill_number, product_name, quantity, unit_price)])
     
     def update_stock(self, product_name, quantity):
-        try:
-            cursor = self.get_cursor()
-            cursor.execute("BEGIN IMMEDIATE TRANSACTION")
+        with self.transaction() as cursor:
+            self._deduct_stock(cursor, {product_name: quantity})
 
-            # Get available stock (only check quantity, not original_quantity)
-            cursor.execute('''
-                SELECT id, quantity 
-                FROM products 
-                WHERE product_name = ? AND quantity > 0
-                ORDER BY purchase_date ASC
-            ''', (product_name,))
-            batches = cursor.fetchall()
-
-            total_available = sum(batch['quantity'] for batch in batches)
-            if total_available < quantity:
-                self.connection.rollback()
-                raise ValueError(f"Insufficient stock. Available: {total_available}, Requested: {quantity}")
-
-            # Deduct from oldest batches first
-            remaining = quantity
-            for batch in batches:
-                if remaining <= 0:
-                    break
-
-                deduct = min(remaining, batch['quantity'])
-                cursor.execute('''
-                    UPDATE products 
-                    SET quantity = quantity - ? 
-                    WHERE id = ?
-                ''', (deduct, batch['id']))
-                remaining -= deduct
+    def _deduct_stock(self, cursor, requested):
+        """Deduct {product_name: quantity} from the oldest batches first, all or nothing"""
+        # Get available stock for every product in one query (only check quantity, not original_quantity)
+        cursor.execute(
+            SQL_AVAILABLE_STOCK, (json.dumps(list(requested)),)
+        )
+        available = {product_name.lower(): total for product_name, total in cursor.fetchall()}
 
-            self.connection.commit()
+        shortfalls = [
+            f"{product_name}. Available: {available.get(product_name.lower(), 0)}, Requested: {quantity}"
+            for product_name, quantity in requested.items()
+            if available.get(product_name.lower(), 0) < quantity
+        ]
+        if shortfalls:
+            raise ValueError("Insufficient stock for " + "; ".join(shortfalls))
 
-        except Exception as e:
-            self.connection.rollback()
-            raise
+        # Deduct from the oldest batches of every product in one FIFO statement
+        cursor.execute(SQL_DEDUCT_STOCK_FIFO, {'requested': json.dumps(requested)})
 
     # GST operations
     def get_gst_slabs(self):
-        cursor = self.get_cursor()
-        cursor.execute("SELECT gst_rate FROM gst_slabs")
-        return [gst[0] for gst in cursor.fetchall()]
+        if self._gst_slabs_cache is None:
+            with self.get_read_cursor() as cursor:
+                cursor.execute("SELECT gst_rate FROM gst_slabs")
+                self._gst_slabs_cache = [gst[0] for gst in cursor.fetchall()]
+        return self._gst_slabs_cache
     
     def add_gst_slab(self, rate):
-        cursor = self.get_cursor()
-        cursor.execute("INSERT INTO gst_slabs (gst_rate) VALUES (?)", (rate,))
-        self.commit()
+        with self.transaction() as cursor:
+            cursor.execute("INSERT INTO gst_slabs (gst_rate) VALUES (?)", (rate,))
+        if self._gst_slabs_cache is not None:
+            self._gst_slabs_cache.append(rate)
 
     # Invoice number operations
     def get_invoice_number(self):
-        current_year = datetime.now().year
-        cursor = self.get_cursor()
-        cursor.execute("SELECT last_invoice_number FROM settings WHERE year=?", (current_year,))
-        result = cursor.fetchone()
-
-        if result is None:
-            cursor.execute("INSERT INTO settings (year, last_invoice_number) VALUES (?, ?)", (current_year, 0))
-            self.commit()
-            last_invoice_number = 0
-        else:
-            last_invoice_number = result[0]
+        now = datetime.now()
+        current_year = now.year
+        with self._write_lock:
+            if self._invoice_state is None or self._invoice_state[0] != current_year:
+                self._invoice_state = (current_year, self._load_last_invoice_number(current_year))
 
-        new_invoice_number = last_invoice_number + 1
+            new_invoice_number = self._invoice_state[1] + 1
 
-        # Reset on April 1st
-        if datetime.now().month == 4 and datetime.now().day == 1:
-            new_invoice_number = 1
+            # Reset on April 1st
+            if now.month == 4 and now.day == 1:
+                new_invoice_number = 1
 
-        cursor.execute("UPDATE settings SET last_invoice_number=? WHERE year=?", (new_invoice_number, current_year))
-        self.commit()
+            self._invoice_previous = self._invoice_state
+            self._invoice_state = (current_year, new_invoice_number)
         return new_invoice_number
-    
-    def check_current_stock(self, product_name):
-        """Debugging method to check current stock levels"""
-        cursor = self.get_cursor()
-        cursor.execute('''
-            SELECT id, quantity, purchase_date 
-            FROM products 
-            WHERE product_name = ? 
-            ORDER BY purchase_date ASC
-        ''', (product_name,))
-        records = cursor.fetchall()
-
-        logger.info(f"Current stock status for {product_name}:")
-        total = 0
+
+    def release_invoice_number(self, invoice_number):
+        """Hand back the latest invoice number when its bill was never saved, keeping numbering gapless"""
+        with self._write_lock:
+            if (self._invoice_previous is not None and self._invoice_state is not None
+                    and self._invoice_state[1] == invoice_number):
+                self._invoice_state = self._invoice_previous
+                self._invoice_previous = None
+
+    def _load_last_invoice_number(self, year):
+        """Read the persisted invoice counter for a year, creating its settings row if missing"""
+        with self.transaction() as cursor:
+            cursor.execute("SELECT last_invoice_number FROM settings WHERE year=?", (year,))
+            result = cursor.fetchone()
+
+            if result is None:
+                cursor.execute("INSERT INTO settings (year, last_invoice_number) VALUES (?, ?)", (year, 0))
+                return 0
+            return result[0] or 0
+
+    def _persist_invoice_number(self, cursor):
+        """Write the in-memory invoice counter back to settings using the caller's transaction"""
+        if self._invoice_state is not None:
+            year, last_invoice_number = self._invoice_state
+            cursor.execute("UPDATE settings SET last_invoice_number=? WHERE year=?", (last_invoice_number, year))
+    
+    def check_current_stock(self, product_names, log_lots=False):
+        """Return {product_name: total quantity} for the given names in one query, optionally logging every batch"""
+        product_names = list(dict.fromkeys(product_names))
+        if not product_names:
+            return {}
+
+        # A fixed statement text per query, so the statement cache is hit whatever the list length
+        names_json = json.dumps(product_names)
+        with self.get_read_cursor() as cursor:
+            if log_lots:
+                cursor.execute('''
+                    SELECT product_name, id, quantity, purchase_date 
+                    FROM products 
+                    WHERE product_name IN (SELECT value FROM json_each(?))
+                    ORDER BY product_name, purchase_date ASC
+                ''', (names_json,))
+                records = cursor.fetchall()
+            else:
+                # Only the totals are needed, so let SQLite sum the batches
+                cursor.execute(SQL_AVAILABLE_STOCK, (names_json,))
+                records = cursor.fetchall()
+
+        # The NOCASE column may store another case than was asked for, so total case-insensitively
+        totals_by_key = {}
         for record in records:
-            logger.info(f"  ID: {record['id']}, Qty: {record['quantity']}, Date: {record['purchase_date']}")
-            total += record['quantity']
-        logger.info(f"Total available: {total}")
-        return total
+            key = record[0].lower()
+            if log_lots:
+                totals_by_key[key] = totals_by_key.get(key, 0) + record['quantity']
+                logger.info(f"  {record['product_name']} ID: {record['id']}, Qty: {record['quantity']}, Date: {record['purchase_date']}")
+            else:
+                totals_by_key[key] = totals_by_key.get(key, 0) + record[1]
+
+        totals = {name: totals_by_key.get(name.lower(), 0) for name in product_names}
+        if log_lots:
+            for name, total in totals.items():
+                logger.info(f"Total available for {name}: {total}")
+        return totals
     
 # Utility functions
 def get_app_path():
@@ -293,136 +976,45 @@ def get_app_path():
     else:
         return os.path.dirname(os.path.abspath(__file__))
 
-def get_db_path():
-    """Get the consistent database path"""
+def get_persistent_db_path():
+    """Get the on-disk database path"""
     app_dir = get_app_path()
     return os.path.join(app_dir, 'stock_management.db')
 
+def get_db_path():
+    """Get the consistent database path (a tmpfs copy when running with --fast-import)"""
+    if FAST_IMPORT:
+        return os.path.join(tempfile.gettempdir(), 'stock_management.db')
+    return get_persistent_db_path()
+
+def copy_database(source_path, target_path):
+    """Copy a database consistently (including any WAL content) with the SQLite backup API"""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def configure_connection(conn, db_path=None, read_only=False):
+    """Apply journal, sync and cache PRAGMAs to a freshly opened connection"""
+    db_path = db_path or get_db_path()
+    conn.execute("PRAGMA foreign_keys = ON")
+    # WAL is not available for in-memory databases and is set by the writer
+    if db_path != ':memory:' and not read_only:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
+    # The tmpfs copy is written back to disk explicitly, so it can skip fsyncs
+    conn.execute("PRAGMA synchronous = OFF" if FAST_IMPORT else "PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -65536")  # 64 MB
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA busy_timeout = 5000")
+
 def setup_database():
     """Initialize the database with required tables"""
-    db_path = get_db_path()
-    logger.info(f"Initializing database at: {db_path}")
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create tables if they don't exist
-    tables = {
-        'companies': '''
-            CREATE TABLE IF NOT EXISTS companies (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                gst_number TEXT,
-                contact TEXT
-            )
-        ''',
-        'customers': '''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                address TEXT,
-                gst_number TEXT,
-                contact TEXT
-            )
-        ''',
-        'products': '''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY,
-            company_id INTEGER,
-            brand TEXT COLLATE NOCASE,
-            product_name TEXT COLLATE NOCASE,
-            original_quantity INTEGER,  
-            quantity INTEGER,           
-            unit_price REAL,
-            cgst REAL,
-            sgst REAL,
-            cess REAL,
-            purchase_date TEXT,
-            company_invoice TEXT,
-            is_current INTEGER DEFAULT 1,
-            FOREIGN KEY (company_id) REFERENCES companies (id)
-        )
-        ''',
-        'gst_slabs': '''
-            CREATE TABLE IF NOT EXISTS gst_slabs (
-                id INTEGER PRIMARY KEY,
-                gst_rate REAL
-            )
-        ''',
-        'settings': '''
-            CREATE TABLE IF NOT EXISTS settings (
-                year INTEGER PRIMARY KEY,
-                last_invoice_number INTEGER
-                low_stock_threshold INTEGER DEFAULT 5
-            )
-        ''',
-        'purchases': '''
-            CREATE TABLE IF NOT EXISTS purchases (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id TEXT,
-                product_name TEXT,
-                quantity INTEGER,
-                unit_price REAL,
-                total_price REAL,
-                purchase_date DATETIME
-            )
-        ''',
-        'bill_items': '''
-            CREATE TABLE IF NOT EXISTS bill_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                bill_number INTEGER,
-                product_name TEXT,
-                quantity INTEGER,
-                unit_price REAL,
-                FOREIGN KEY (bill_number) REFERENCES billing(bill_number)
-            )
-        ''',
-        'billing': '''
-            CREATE TABLE IF NOT EXISTS billing (
-                bill_number INTEGER PRIMARY KEY,
-                customer_name TEXT,
-                total_amount REAL,
-                bill_date TEXT
-            )
-        ''',
-        'users': '''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE,
-                password TEXT,
-                role TEXT
-            )
-        '''
-    }
-    
-    for table_name, table_sql in tables.items():
-        cursor.execute(table_sql)
-        logger.info(f"Created table {table_name} or it already exists.")
-
-    # Check and add low_stock_threshold column if it doesn't exist
-    cursor.execute("PRAGMA table_info(settings)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if 'low_stock_threshold' not in columns:
-        cursor.execute("ALTER TABLE settings ADD COLUMN low_stock_threshold INTEGER DEFAULT 5")
-        logger.info("Added low_stock_threshold column to settings table")
-    
-    conn.commit()
-    
-    # Initialize settings for current year
-    current_year = datetime.now().year
-    cursor.execute("INSERT OR IGNORE INTO settings (year, last_invoice_number) VALUES (?, ?)", (current_year, 0))
-    
-    # Create default admin user if not exists
-    cursor.execute("SELECT COUNT(*) FROM users WHERE username='admin'")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute(
-            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-            ('admin', 'admin123', 'admin')  # In production, use hashed passwords!
-        )
-        logger.info("Created default admin user")
-    
-    conn.commit()
-    conn.close()
+    return DatabaseHandler()
 
 # Decorators for authentication and authorization
 def login_required(func):
@@ -448,12 +1040,123 @@ def admin_required(func):
 
 # Main Application Class
 class StockManagementApp:
+    WAL_CHECKPOINT_INTERVAL_MS = 60_000
+    # Quiet period after the last keystroke before a search runs
+    SEARCH_DEBOUNCE_MS = 120
+    # Purchase history filter: pause after typing, and the shorter delay after picking a filter type
+    PURCHASE_FILTER_DEBOUNCE_MS = 300
+    PURCHASE_FILTER_TYPE_DELAY_MS = 50
+    # Rows per batch handed from the report worker, and how often the UI picks them up
+    REPORT_CHUNK_SIZE = 500
+    REPORT_POLL_MS = 50
+    # Rows inserted into a paged history tree at a time, and how near the end of the
+    # inserted rows (as a yview fraction) scrolling pulls in the next page
+    TREE_PAGE_SIZE = 200
+    TREE_PAGE_PREFETCH = 0.8
+    TREE_LOAD_POLL_MS = 50
+    # (name, width, anchor) of the history window columns
+    PURCHASE_COLUMNS = (
+        ("ID", 50, tk.CENTER),
+        ("Company", 150, tk.CENTER),
+        ("Brand", 100, tk.CENTER),
+        ("Product", 150, tk.CENTER),
+        ("Original", 80, tk.CENTER),
+        ("Remaining", 80, tk.CENTER),
+        ("Sold", 80, tk.CENTER),
+        ("Price", 80, tk.CENTER),
+        ("Purchase Date", 120, tk.CENTER),
+        ("Invoice", 120, tk.CENTER)
+    )
+    BILL_COLUMNS = (
+        ("Bill No", 100, tk.CENTER),
+        ("Customer", 200, tk.W),
+        ("Amount", 100, tk.E),
+        ("Date", 150, tk.CENTER)
+    )
+    BILL_ITEM_COLUMNS = (
+        ("Bill No", 100, tk.CENTER),
+        ("Product", 200, tk.W),
+        ("Qty", 50, tk.CENTER),
+        ("Price", 100, tk.E),
+        ("Total", 100, tk.E)
+    )
+    # Report name -> (columns, query, row formatter, date column filtered by From/To).
+    # A query of None reports on the cached inventory rows instead of the database.
+    REPORTS = {
+        "Stock Report": (
+            (("Company", 150), ("Brand", 120), ("Product", 200), ("Quantity", 80),
+             ("Unit Price", 100), ("CGST%", 80), ("SGST%", 80), ("Last Purchase", 120)),
+            None,
+            format_stock_report_row,
+            None
+        ),
+        "Sales Report": (
+            (("Invoice No", 100), ("Customer", 150), ("Date", 120), ("Amount", 100)),
+            "SELECT bill_number, customer_name, bill_date, printf('₹%.2f', total_amount) FROM billing",
+            format_sales_report_row,
+            "bill_date"
+        ),
+        "Customer Report": (
+            (("Name", 150), ("Address", 200), ("GST No", 120), ("Contact", 120)),
+            "SELECT name, address, gst_number, contact FROM customers",
+            None,
+            None
+        ),
+        # Rows come back already formatted, in display column order
+        "Product Sales Report": (
+            (("Product", 200), ("Qty Sold", 100), ("Revenue", 120)),
+            '''
+                SELECT product_name, SUM(quantity) as qty, 
+                       printf('₹%.2f', SUM(quantity*unit_price)) as revenue
+                FROM bill_items 
+                GROUP BY product_name
+                ORDER BY qty DESC
+            ''',
+            None,
+            None
+        ),
+    }
+
     def __init__(self, root):
-        setup_database()
-        self.db = DatabaseHandler()
+        self.db = setup_database()
         self.root = root
+        self.root.tk.eval(TCL_INSERT_ROWS)
+        self.root.tk.eval(TCL_SETUP_COLUMNS)
         self.root.title("Stock Management System")
         self.current_user = None
+
+        # Product names and stock totals, filtered in memory while typing
+        self.all_products = []
+        self.stock_summary = []
+        self.stock_summary_keys = []
+        self._stock_by_product = {}
+        self._product_cache_dirty = True
+        self._products_cache = None
+        self._search_haystacks = []
+        # (number, item rows) of the bill whose items were shown last
+        self._last_bill_items = None
+
+        # Rows of the paged history trees not inserted yet, keyed by tree
+        self._tree_pages = {}
+        # History tree loads running on worker threads, handing rows over through the queue
+        self._tree_loads = {}
+        self._tree_load_queue = queue.Queue()
+        self._tree_load_polling = False
+
+        # Low-stock threshold only changes through set_low_stock_threshold
+        self._low_stock_threshold = self._fetch_threshold()
+
+        # Pending debounced inventory search and product filter, if any, and the text each search box last ran with
+        self._search_after_id = None
+        self._prod_after_id = None
+        self._last_search_term = ""
+        self._last_product_filter = ""
+        self._purchase_filter_after_id = None
+        self._last_purchase_filter = ""
+
+        # Searches match name prefixes unless "Contains" is ticked
+        self.inventory_contains_var = tk.BooleanVar(value=False)
+        self.billing_contains_var = tk.BooleanVar(value=False)
         
         # Configure window size and styles
         self.root.geometry("1200x800")
@@ -465,6 +1168,17 @@ class StockManagementApp:
         # Initialize other UI components after successful login
         self.initialize_ui_components()
 
+        # Keep the WAL file bounded during long sessions
+        self.root.after(self.WAL_CHECKPOINT_INTERVAL_MS, self._checkpoint)
+
+    def _checkpoint(self):
+        """Run a passive WAL checkpoint and reschedule itself"""
+        try:
+            self.db.checkpoint()
+        except sqlite3.Error as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
+        self.root.after(self.WAL_CHECKPOINT_INTERVAL_MS, self._checkpoint)
+
     def select_product_from_stock_view(self, event):
         """Auto-fill product details when clicking in stock view"""
         selected = self.stock_tree.selection()
@@ -536,11 +1250,15 @@ class StockManagementApp:
             messagebox.showerror("Error", "Please enter both username and password")
             return
         
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT * FROM users WHERE username=?", (username,))
-        user = cursor.fetchone()
+        with self.db.get_read_cursor() as cursor:
+            cursor.execute("SELECT * FROM users WHERE username=?", (username,))
+            user = cursor.fetchone()
         
-        if user and user['password'] == password:  # In production, use proper password hashing!
+        if user and verify_password(user['password'], password):
+            # Upgrade accounts still stored in plaintext
+            if not is_password_hashed(user['password']):
+                with self.db.transaction() as tx:
+                    tx.execute("UPDATE users SET password=? WHERE id=?", (hash_password(password), user['id']))
             self.current_user = dict(user)
             self.auth_frame.destroy()
             self.setup_main_ui()
@@ -552,7 +1270,7 @@ class StockManagementApp:
     def initialize_ui_components(self):
         """Initialize UI components that will be shown after login"""
         self.added_items = []
-        self.temp_products = []
+        self.temp_products = {}  # billing tree iid -> item
         self.total_cgst = 0.0
         self.total_sgst = 0.0
         
@@ -681,13 +1399,16 @@ class StockManagementApp:
     
     def load_users(self):
         """Load users into the treeview"""
-        for item in self.users_tree.get_children():
-            self.users_tree.delete(item)
+        self.users_tree.delete(*self.users_tree.get_children())
         
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT id, username, role FROM users")
-        for user in cursor.fetchall():
-            self.users_tree.insert("", "end", values=(user['id'], user['username'], user['role']))
+        with self.db.get_read_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute("SELECT id, username, role FROM users")
+            # Stream rows straight from the cursor instead of materializing them first
+            insert = self.users_tree.insert
+            for user in cursor:
+                # The user id doubles as the row iid so single rows can be updated in place
+                insert("", "end", iid=str(user[0]), values=user)
     
     def add_user_dialog(self):
         """Dialog for adding a new user"""
@@ -717,13 +1438,13 @@ class StockManagementApp:
                 return
             
             try:
-                cursor = self.db.get_cursor()
-                cursor.execute(
-                    "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                    (username, password, role)  # In production, hash the password!
-                )
-                self.db.commit()
-                self.load_users()
+                with self.db.transaction() as cursor:
+                    cursor.execute(
+                        "INSERT INTO users (username, password, role) VALUES (?, ?, ?) RETURNING id, username, role",
+                        (username, hash_password(password), role)
+                    )
+                    user = cursor.fetchall()[0]
+                self.users_tree.insert("", "end", iid=str(user['id']), values=(user['id'], user['username'], user['role']))
                 dialog.destroy()
                 messagebox.showinfo("Success", "User added successfully")
             except sqlite3.IntegrityError:
@@ -740,9 +1461,9 @@ class StockManagementApp:
         
         user_id = self.users_tree.item(selected[0], "values")[0]
         
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT * FROM users WHERE id=?", (user_id,))
-        user = cursor.fetchone()
+        with self.db.get_read_cursor() as cursor:
+            cursor.execute("SELECT * FROM users WHERE id=?", (user_id,))
+            user = cursor.fetchone()
         
         dialog = tk.Toplevel(self.root)
         dialog.title("Edit User")
@@ -771,19 +1492,20 @@ class StockManagementApp:
                 return
             
             try:
-                cursor = self.db.get_cursor()
-                if password:  # Only update password if provided
-                    cursor.execute(
-                        "UPDATE users SET username=?, password=?, role=? WHERE id=?",
-                        (username, password, role, user_id)  # In production, hash the password!
-                    )
-                else:
-                    cursor.execute(
-                        "UPDATE users SET username=?, role=? WHERE id=?",
-                        (username, role, user_id)
-                    )
-                self.db.commit()
-                self.load_users()
+                with self.db.transaction() as cursor:
+                    if password:  # Only update password if provided
+                        cursor.execute(
+                            "UPDATE users SET username=?, password=?, role=? WHERE id=? RETURNING id, username, role",
+                            (username, hash_password(password), role, user_id)
+                        )
+                    else:
+                        cursor.execute(
+                            "UPDATE users SET username=?, role=? WHERE id=? RETURNING id, username, role",
+                            (username, role, user_id)
+                        )
+                    updated = cursor.fetchall()
+                for user in updated:
+                    self.users_tree.item(str(user['id']), values=(user['id'], user['username'], user['role']))
                 dialog.destroy()
                 messagebox.showinfo("Success", "User updated successfully")
             except sqlite3.IntegrityError:
@@ -806,10 +1528,11 @@ class StockManagementApp:
             return
         
         if messagebox.askyesno("Confirm", f"Are you sure you want to delete user {username}?"):
-            cursor = self.db.get_cursor()
-            cursor.execute("DELETE FROM users WHERE id=?", (user_id,))
-            self.db.commit()
-            self.load_users()
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM users WHERE id=? RETURNING id", (user_id,))
+                deleted = cursor.fetchall()
+            for user in deleted:
+                self.users_tree.delete(str(user['id']))
             messagebox.showinfo("Success", "User deleted successfully")
     
     def setup_inventory_tab(self):
@@ -831,8 +1554,9 @@ class StockManagementApp:
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
-        # self.search_entry.bind("<KeyRelease>", self.schedule_inventory_search)
-        self.search_entry.bind("<KeyRelease>", self.real_time_inventory_search)
+        self.search_entry.bind("<KeyRelease>", self.schedule_inventory_search)
+        ttk.Checkbutton(search_frame, text="Contains", variable=self.inventory_contains_var,
+                        command=self.search_products).pack(side=tk.LEFT, padx=5)
         
         # Product List with scrollbars
         container = ttk.Frame(self.inventory_tab)
@@ -860,6 +1584,9 @@ class StockManagementApp:
         
         # Pack treeview
         self.product_list.pack(fill=tk.BOTH, expand=True)
+
+        # Configure tag for low stock items (red background)
+        self.product_list.tag_configure('low_stock', background='#ffdddd', foreground='black')
         
         # Configure columns
         columns = ["Company", "Brand", "Product Name", "Quantity", "Unit Price", "CGST", "SGST", "CESS", "Purchase Date"]
@@ -882,12 +1609,27 @@ class StockManagementApp:
 
     def schedule_inventory_search(self, event):
         """Schedule search with small delay to avoid excessive queries"""
-        if hasattr(self, '_search_after_id'):
+        # Skip non-text keys
+        if event.keysym in NAVIGATION_KEYS:
+            return
+
+        # Keys that left the text unchanged (e.g. Home/End) need no new search
+        term = self.search_entry.get().strip().lower()
+        if term == self._last_search_term:
+            return
+        self._last_search_term = term
+
+        if self._search_after_id is not None:
             self.root.after_cancel(self._search_after_id)
 
-        # Schedule search after 300ms of inactivity
-        self._search_after_id = self.root.after(300, self.search_products)
+        # Schedule search after a short pause in typing
+        self._search_after_id = self.root.after(self.SEARCH_DEBOUNCE_MS, self._do_inventory_search)
     
+    def _do_inventory_search(self):
+        """Run the debounced inventory search"""
+        self._search_after_id = None
+        self.search_products()
+
     def search_products(self):
         """Search products based on search term"""
         search_term = self.search_entry.get().strip().lower()
@@ -896,72 +1638,60 @@ class StockManagementApp:
             self.load_products()
             return
         
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT 
-                COALESCE(c.name, 'No Company'), 
-                p.brand, 
-                p.product_name, 
-                p.quantity, 
-                p.unit_price, 
-                p.cgst, 
-                p.sgst, 
-                p.cess, 
-                COALESCE(p.purchase_date, '')
-            FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
-            WHERE p.product_name LIKE ? OR p.brand LIKE ? OR c.name LIKE ?
-        ''', (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-        
-        products = [tuple(row) for row in cursor.fetchall()]
-        
-        # Clear current items
-        for item in self.product_list.get_children():
-            self.product_list.delete(item)
+        if self.inventory_contains_var.get():
+            # Substring matches can't use an index, so filter the cached rows instead of scanning in SQL
+            products = self._get_products_cached()
+            products = [p for p, hay in zip(products, self._search_haystacks) if search_term in hay]
+        else:
+            products = self.db.search_products(search_term)
         
-        # Add matching products
-        for product in products:
-            self.product_list.insert("", "end", values=product)
+        # Replace the list with matching products
+        self.fill_product_list(products, self._low_stock_threshold)
+
+    def retag_low_stock(self, threshold):
+        """Re-apply low stock highlighting to the listed rows without refetching them"""
+        product_list = self.product_list
+        for iid in product_list.get_children():
+            quantity = float(product_list.set(iid, "Quantity"))
+            product_list.item(iid, tags=LOW_STOCK_TAGS if quantity <= threshold else NO_TAGS)
+
+    def fill_product_list(self, products, threshold=None):
+        """Replace the inventory list rows, tagging low stock rows when a threshold is given"""
+        product_list = self.product_list
+        product_list.delete(*product_list.get_children())
+
+        if threshold is None:
+            self.insert_rows(product_list, products)
+        else:
+            insert = product_list.insert
+            for product in products:
+                insert("", "end", values=product,
+                       tags=LOW_STOCK_TAGS if product[3] <= threshold else NO_TAGS)
     
     def load_products(self):
         """Load all products into the inventory list with low-stock highlighting"""
         try:
-            # Clear current items
-            for item in self.product_list.get_children():
-                self.product_list.delete(item)
-
-            # Get threshold from settings
-            cursor = self.db.get_cursor()
-            cursor.execute("SELECT low_stock_threshold FROM settings WHERE year=?", (datetime.now().year,))
-            result = cursor.fetchone()
-            threshold = result['low_stock_threshold'] if result and 'low_stock_threshold' in result.keys() else 5
-
-            # Get products from database
-            products = self.db.get_products()
-
-            total_value = 0.0  # Initialize total stock value
+            # Get products, from the database only after an inventory change
+            products = self._get_products_cached()
 
             # Add to treeview with color coding
-            for product in products:
-                quantity = product[3]  # Assuming quantity is the 4th column
-                price = product[4]    # Assuming price is the 5th column
-                total_value += quantity * price  # Update total stock value
-
-                if quantity <= threshold:
-                    self.product_list.insert("", "end", values=product, tags=('low_stock',))
-                else:
-                    self.product_list.insert("", "end", values=product)
+            self.fill_product_list(products, self._low_stock_threshold)
 
             # Update the total stock value label
+            total_value = self.db.get_total_stock_value()
             self.total_stock_value_label.config(text=f"₹{total_value:,.2f}")
 
-            # Configure tag for low stock items (red background)
-            self.product_list.tag_configure('low_stock', background='#ffdddd', foreground='black')
-
         except Exception as e:
             logger.error(f"Error loading products: {e}")
             messagebox.showerror("Error", f"Failed to load products: {str(e)}")
 
+    def _fetch_threshold(self):
+        """Read this year's low-stock threshold from settings, defaulting to 5"""
+        with self.db.get_read_cursor() as cursor:
+            cursor.execute("SELECT low_stock_threshold FROM settings WHERE year=?", (datetime.now().year,))
+            result = cursor.fetchone()
+        return result['low_stock_threshold'] if result and result['low_stock_threshold'] is not None else 5
+
     def set_low_stock_threshold(self):
         """Allow admin to change the low-stock alert threshold"""
         threshold = simpledialog.askinteger(
@@ -969,13 +1699,18 @@ class StockManagementApp:
             "Enter minimum stock quantity to trigger alerts:",
             parent=self.root,
             minvalue=1,
-            initialvalue=5
+            initialvalue=self._low_stock_threshold
         )
         if threshold:
-            cursor = self.db.get_cursor()
-            cursor.execute("UPDATE settings SET low_stock_threshold=? WHERE year=?", (threshold, datetime.now().year))
-            self.db.commit()
-            self.load_products()  # Refresh to apply new threshold
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    "UPDATE settings SET low_stock_threshold=? WHERE year=? RETURNING low_stock_threshold",
+                    (threshold, datetime.now().year)
+                )
+                updated = cursor.fetchall()
+            for row in updated:
+                self._low_stock_threshold = row['low_stock_threshold']
+                self.retag_low_stock(self._low_stock_threshold)  # Recolour rows already on screen
     
     def on_product_double_click(self, event):
         """Handle double click on product in inventory list"""
@@ -1004,41 +1739,90 @@ class StockManagementApp:
             logger.error(f"Error showing product details: {e}")
             messagebox.showerror("Error", "Failed to show product details")
 
-    def update_product_suggestions(self, event):
-        """Update product suggestions based on typed text"""
-        typed = self.billing_product_combobox.get()
-        if not typed:
-            self.load_billing_products()
+    def refresh_product_cache(self):
+        """Reload the cached stock summary if inventory changed since the last load"""
+        if not self._product_cache_dirty:
             return
 
-        cursor = self.db.get_cursor()
-        cursor.execute("""
-            SELECT DISTINCT product_name FROM products 
-            WHERE product_name LIKE ? 
-            ORDER BY product_name
-        """, (f'%{typed}%',))
+        # Prices are formatted here once rather than on every mini stock view refresh
+        self.stock_summary = [
+            (product_name, total_stock, f"₹{unit_price:.2f}")
+            for product_name, total_stock, unit_price in self.db.get_stock_summary()
+        ]
+        self.all_products = list(dict.fromkeys(row[0] for row in self.stock_summary))
+        # Sorted lowercase keys let the mini stock view bisect to a prefix range
+        self.stock_summary.sort(key=lambda row: row[0].lower())
+        self.stock_summary_keys = [row[0].lower() for row in self.stock_summary]
+        self._stock_by_product = self.db.get_product_stock()
+        self._product_cache_dirty = False
+
+    def lookup_product_stock(self, product_name):
+        """Return cached stock and tax rates for a product, querying SQLite on a miss"""
+        self.refresh_product_cache()
+        key = product_name.lower()
+        product_data = self._stock_by_product.get(key)
+        if product_data is None:
+            product_data = self.db.get_product_stock(product_name).get(key)
+            if product_data is not None:
+                self._stock_by_product[key] = product_data
+        return product_data
+
+    def _billed_quantity(self, product_name, exclude_iid=None):
+        """Quantity of a product already on the current bill, optionally ignoring one row"""
+        key = product_name.lower()
+        return sum(
+            item['quantity'] for iid, item in self.temp_products.items()
+            if iid != exclude_iid and item['product_name'].lower() == key
+        )
 
-        products = [row[0] for row in cursor.fetchall()]
-        self.billing_product_combobox['values'] = products
+    def _get_products_cached(self):
+        """Return the inventory list rows, fetching them only after an inventory change"""
+        if self._products_cache is None:
+            self._products_cache = self.db.get_products()
+            # Lowercased company, brand and product name per row for "Contains" searches
+            self._search_haystacks = [
+                f"{company}\n{brand}\n{product_name}".lower()
+                for company, brand, product_name, *_ in self._products_cache
+            ]
+        return self._products_cache
+
+    def invalidate_product_cache(self):
+        """Mark the cached stock summary and inventory rows stale after an inventory change"""
+        self._product_cache_dirty = True
+        self._products_cache = None
 
     def update_combobox_values(self):
-        """Update combobox values from database"""
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT DISTINCT product_name FROM products ORDER BY product_name")
-        self.all_products = [row[0] for row in cursor.fetchall()]
+        """Update combobox values from the product cache"""
+        self.refresh_product_cache()
         self.billing_product_combobox['values'] = self.all_products
 
-    def real_time_product_filter(self, event):
-        """Filter products in real-time as user types"""
+    def schedule_product_filter(self, event):
+        """Debounce product filtering so a burst of keystrokes triggers a single refresh"""
         # Only process alphanumeric keys and backspace
-        if event.keysym in ('Escape', 'Return', 'Tab', 'Up', 'Down', 'Left', 'Right'):
+        if event.keysym in NAVIGATION_KEYS:
+            return
+
+        typed = self.billing_product_combobox.get().lower()
+        if typed == self._last_product_filter:
             return
+        self._last_product_filter = typed
+
+        if self._prod_after_id is not None:
+            self.root.after_cancel(self._prod_after_id)
+
+        # Filter after 200ms of inactivity
+        self._prod_after_id = self.root.after(200, self._do_product_filter)
 
+    def _do_product_filter(self):
+        """Refresh combobox suggestions and the mini stock view for the typed text"""
+        self._prod_after_id = None
         typed = self.billing_product_combobox.get().lower()
 
         # Filter products based on typed text
-        if typed:
+        if typed and self.billing_contains_var.get():
             filtered = [p for p in self.all_products if typed in p.lower()]
+        elif typed:
+            filtered = [p for p in self.all_products if p.lower().startswith(typed)]
         else:
             filtered = self.all_products
 
@@ -1046,7 +1830,7 @@ class StockManagementApp:
         self.billing_product_combobox['values'] = filtered
 
         # Also filter the mini stock view
-        self.filter_mini_stock_view(event)
+        self.filter_mini_stock_view()
 
     def show_dropdown_options(self, event=None):
         """Show dropdown options when down arrow is pressed"""
@@ -1091,8 +1875,9 @@ class StockManagementApp:
         ttk.Label(product_frame, text="Product:").pack(side=tk.LEFT, padx=5)
         self.billing_product_combobox = ttk.Combobox(product_frame)
         self.billing_product_combobox.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
-        self.update_combobox_values()
-        self.billing_product_combobox.bind('<KeyRelease>', self.real_time_product_filter)
+        self.billing_product_combobox.bind('<KeyRelease>', self.schedule_product_filter)
+        ttk.Checkbutton(product_frame, text="Contains", variable=self.billing_contains_var,
+                        command=self._do_product_filter).pack(side=tk.LEFT, padx=5)
 
         # Load initial values
         self.update_combobox_values()
@@ -1108,10 +1893,6 @@ class StockManagementApp:
         ttk.Button(product_frame, text="Update", command=self.update_billing_item, width=8).pack(side=tk.LEFT, padx=5)
         ttk.Button(product_frame, text="Add Item", command=self.add_billing_item, width=10).pack(side=tk.LEFT, padx=5)
 
-        # Setup autocomplete
-        self.billing_product_combobox.bind('<KeyRelease>', lambda e: self.update_product_suggestions(e))
-        self.billing_product_combobox.bind("<KeyRelease>", self.filter_mini_stock_view)
-
         # Items table with scrollbars
         tree_frame = ttk.Frame(main_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -1184,8 +1965,8 @@ class StockManagementApp:
         # Bind customer selection change
         self.billing_customer_combobox.bind("<<ComboboxSelected>>", self.on_customer_selected)
 
-        # Initialize temp products list
-        self.temp_products = []
+        # Initialize temp products, keyed by billing tree iid
+        self.temp_products = {}
 
         # Mini stock view with increased height
         stock_frame = ttk.Frame(self.billing_tab)
@@ -1220,62 +2001,22 @@ class StockManagementApp:
         # Load initial data
         self.load_mini_stock_view()
 
-    def _setup_mini_stock_view(self):
-        """Initialize the mini stock treeview"""
-        stock_frame = ttk.Frame(self.billing_tab)
-        stock_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-        self.stock_tree = ttk.Treeview(
-            stock_frame,
-            columns=("Product", "Stock", "Price"),
-            show='headings',
-            height=5,
-            selectmode='browse'
-        )
-
-        # Configure columns
-        self.stock_tree.heading("Product", text="Product")
-        self.stock_tree.heading("Stock", text="Available")
-        self.stock_tree.heading("Price", text="Unit Price")
-
-        self.stock_tree.column("Product", width=150)
-        self.stock_tree.column("Stock", width=80, anchor=tk.CENTER)
-        self.stock_tree.column("Price", width=100, anchor=tk.E)
-
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(stock_frame, orient=tk.VERTICAL, command=self.stock_tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.stock_tree.configure(yscrollcommand=scrollbar.set)
-        self.stock_tree.pack(fill=tk.BOTH, expand=True)
-
-        # Load initial data
-        self.load_mini_stock_view()
-    
     def load_mini_stock_view(self, filter_text=""):
         """Load/refresh the mini stock view with optional filter"""
         self.stock_tree.delete(*self.stock_tree.get_children())
 
-        cursor = self.db.get_cursor()
-        query = '''
-            SELECT 
-                product_name,
-                SUM(quantity) as total_stock,
-                unit_price
-            FROM products
-            WHERE product_name LIKE ?
-            GROUP BY product_name, unit_price
-            ORDER BY product_name
-        '''
-        cursor.execute(query, (f"%{filter_text}%",))
-
-        for product in cursor.fetchall():
-            self.stock_tree.insert("", "end", values=(
-                product['product_name'],
-                product['total_stock'],
-                f"₹{product['unit_price']:.2f}"
-            ))
+        self.refresh_product_cache()
+        typed = filter_text.lower()
+        keys = self.stock_summary_keys
+        if self.billing_contains_var.get():
+            rows = [row for row, key in zip(self.stock_summary, keys) if typed in key]
+        else:
+            start = bisect.bisect_left(keys, typed)
+            end = bisect.bisect_left(keys, typed + '\U0010ffff', start)
+            rows = self.stock_summary[start:end]
+        self.insert_rows(self.stock_tree, rows)
 
-    def filter_mini_stock_view(self, event):
+    def filter_mini_stock_view(self, event=None):
         """Filter stock view as user types"""
         search_term = self.billing_product_combobox.get()
         self.load_mini_stock_view(search_term)
@@ -1286,16 +2027,16 @@ class StockManagementApp:
         if not selected:
             return
 
-        # Get selected item values
+        # The tree only displays items; read the numbers from temp_products
         item = selected[0]
-        values = self.billing_items_tree.item(item, 'values')
+        product = self.temp_products[item]
 
         # Pre-fill the input fields
-        self.billing_product_combobox.set(values[0])
+        self.billing_product_combobox.set(product['product_name'])
         self.billing_qty_entry.delete(0, tk.END)
-        self.billing_qty_entry.insert(0, values[1])
+        self.billing_qty_entry.insert(0, product['quantity'])
         self.billing_price_entry.delete(0, tk.END)
-        self.billing_price_entry.insert(0, values[2].replace("₹", ""))
+        self.billing_price_entry.insert(0, f"{product['unit_price']:.2f}")
 
         # Store reference to item being edited
         self.editing_item = item
@@ -1307,10 +2048,7 @@ class StockManagementApp:
     
     def load_billing_products(self):
         """Load products into billing combobox"""
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT DISTINCT product_name FROM products ORDER BY product_name")
-        products = [row[0] for row in cursor.fetchall()]
-        self.billing_product_combobox['values'] = products
+        self.update_combobox_values()
     
     def on_customer_selected(self, event):
         """Update customer address when customer is selected"""
@@ -1335,23 +2073,18 @@ class StockManagementApp:
             messagebox.showerror("Error", "Quantity must be integer and price must be numeric")
             return
 
-        # Get product details from database with distinct variable name
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT p.product_name, p.cgst, p.sgst, SUM(p.quantity) as total_quantity 
-            FROM products p 
-            WHERE p.product_name = ?
-            GROUP BY p.product_name, p.cgst, p.sgst
-        ''', (product_name,))
-        product_data = cursor.fetchone()
+        # Get product details from the stock cache
+        product_data = self.lookup_product_stock(product_name)
 
         if not product_data:
             messagebox.showerror("Error", "Product not found in database")
             return
 
-        if quantity > product_data['total_quantity']:
+        # Stock already on this bill is not available again
+        available = product_data['total_quantity'] - self._billed_quantity(product_name)
+        if quantity > available:
             messagebox.showerror("Error", 
-                f"Not enough stock. Only {product_data['total_quantity']} available (total across all batches)")
+                f"Not enough stock. Only {available} available (total across all batches)")
             return
 
         # Calculate taxes and total
@@ -1360,7 +2093,7 @@ class StockManagementApp:
         item_total = (price * quantity) + cgst_amount + sgst_amount
 
         # Add to treeview
-        self.billing_items_tree.insert("", "end", values=(
+        iid = self.billing_items_tree.insert("", "end", values=(
             product_name,
             quantity,
             f"{price:.2f}",
@@ -1369,14 +2102,19 @@ class StockManagementApp:
             f"{item_total:.2f}"
         ))
 
-        # Add to temporary list for later processing
-        self.temp_products.append({
+        # Add to temporary products for later processing
+        self.temp_products[iid] = {
             'product_name': product_name,
             'quantity': quantity,
             'unit_price': price,
             'cgst': product_data['cgst'],
-            'sgst': product_data['sgst']
-        })
+            'sgst': product_data['sgst'],
+            # Amounts worked out once here so totals are plain sums
+            'value': price * quantity,
+            'cgst_amount': cgst_amount,
+            'sgst_amount': sgst_amount,
+            'line_total': item_total
+        }
 
         # Update totals
         self.update_billing_totals()
@@ -1390,15 +2128,10 @@ class StockManagementApp:
         if not hasattr(self, 'subtotal_label') or not self.subtotal_label.winfo_exists():
             return  # Exit if widgets don't exist
 
-        subtotal = 0.0
-        total_cgst = 0.0
-        total_sgst = 0.0
-
-        for item in self.temp_products:
-            item_value = item['quantity'] * item['unit_price']
-            subtotal += item_value
-            total_cgst += item_value * (item['cgst'] / 100)
-            total_sgst += item_value * (item['sgst'] / 100)
+        items = self.temp_products.values()
+        subtotal = sum(item['value'] for item in items)
+        total_cgst = sum(item['cgst_amount'] for item in items)
+        total_sgst = sum(item['sgst_amount'] for item in items)
 
         total = subtotal + total_cgst + total_sgst
 
@@ -1417,15 +2150,8 @@ class StockManagementApp:
         if selected:
             # Remove selected items
             for item in selected:
-                # Find index in temp_products
-                values = self.billing_items_tree.item(item, 'values')
-                product_name = values[0]
-
-                # Remove from temp_products
-                self.temp_products = [p for p in self.temp_products if p['product_name'] != product_name]
-
-                # Remove from tree
-                self.billing_items_tree.delete(item)
+                self.temp_products.pop(item, None)
+            self.billing_items_tree.delete(*selected)
         else:
             # Clear all items if nothing selected
             self.billing_items_tree.delete(*self.billing_items_tree.get_children())
@@ -1454,23 +2180,17 @@ class StockManagementApp:
             messagebox.showerror("Error", "Quantity must be integer and price must be numeric")
             return
 
-        # Get product details from database
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT p.product_name, p.cgst, p.sgst, SUM(p.quantity) as total_quantity 
-            FROM products p 
-            WHERE p.product_name = ?
-            GROUP BY p.product_name, p.cgst, p.sgst
-        ''', (product_name,))
-        product_data = cursor.fetchone()
+        # Get product details from the stock cache
+        product_data = self.lookup_product_stock(product_name)
 
         if not product_data:
             messagebox.showerror("Error", "Product not found in database")
             return
 
-        if quantity > product_data['total_quantity']:
+        available = product_data['total_quantity'] - self._billed_quantity(product_name, self.editing_item)
+        if quantity > available:
             messagebox.showerror("Error", 
-                f"Not enough stock. Only {product_data['total_quantity']} available")
+                f"Not enough stock. Only {available} available")
             return
 
         # Calculate taxes and total
@@ -1488,12 +2208,19 @@ class StockManagementApp:
             f"{item_total:.2f}"
         ))
 
-        # Update temporary products list
-        for product in self.temp_products:
-            if product['product_name'] == product_name:
-                product['quantity'] = quantity
-                product['unit_price'] = price
-                break
+        # Update temporary products
+        self.temp_products[self.editing_item] = {
+            'product_name': product_name,
+            'quantity': quantity,
+            'unit_price': price,
+            'cgst': product_data['cgst'],
+            'sgst': product_data['sgst'],
+            # Amounts worked out once here so totals are plain sums
+            'value': price * quantity,
+            'cgst_amount': cgst_amount,
+            'sgst_amount': sgst_amount,
+            'line_total': item_total
+        }
 
         # Update totals
         self.update_billing_totals()
@@ -1509,8 +2236,8 @@ class StockManagementApp:
         """Generate bill and save to database with detailed logging"""
         try:
             # DEBUG: Check stock before processing
-            for item in self.temp_products:
-                self.db.check_current_stock(item['product_name'])
+            if logger.isEnabledFor(logging.DEBUG):
+                self.db.check_current_stock((item['product_name'] for item in self.temp_products.values()), log_lots=True)
             
             logger.info("=== Starting bill generation process ===")
 
@@ -1527,7 +2254,7 @@ class StockManagementApp:
 
             logger.info(f"Generating bill for customer: {customer_name}")
             logger.info("Items in bill:")
-            for idx, item in enumerate(self.temp_products, 1):
+            for idx, item in enumerate(self.temp_products.values(), 1):
                 logger.info(f"  {idx}. {item['product_name']} - Qty: {item['quantity']}, Price: {item['unit_price']}")
 
             # Get invoice number
@@ -1535,12 +2262,9 @@ class StockManagementApp:
             logger.info(f"Generated invoice number: {invoice_number}")
 
             # Calculate total from items
-            total_amount = 0.0
-            for item in self.temp_products:
-                item_value = item['quantity'] * item['unit_price']
-                item_total = item_value * (1 + (item['cgst'] + item['sgst']) / 100)
-                total_amount += item_total
-                logger.info(f"Calculated item total for {item['product_name']}: {item_total:.2f}")
+            total_amount = sum(item['line_total'] for item in self.temp_products.values())
+            for item in self.temp_products.values():
+                logger.info(f"Calculated item total for {item['product_name']}: {item['line_total']:.2f}")
 
             logger.info(f"Total bill amount: {total_amount:.2f}")
 
@@ -1548,48 +2272,42 @@ class StockManagementApp:
             bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"Bill date: {bill_date}")
 
+            bill_saved = False
             try:
-                # Save bill to database
-                logger.info("Creating bill record in database...")
-                self.db.create_bill(invoice_number, customer_name, total_amount, bill_date)
-                logger.info("Bill record created successfully")
-
-                # Save bill items and update stock
-                for item in self.temp_products:
+                # Verify stock for every item before anything is written, with one query for the whole bill
+                stock_levels = self.db.check_current_stock(item['product_name'] for item in self.temp_products.values())
+                bill_rows = []
+                needed = {}
+                for item in self.temp_products.values():
                     product_name = item['product_name']
                     quantity = item['quantity']
 
                     logger.info(f"Processing item: {product_name} (Qty: {quantity})")
+                    needed[product_name] = needed.get(product_name, 0) + quantity
+                    bill_rows.append((invoice_number, product_name, quantity, item['unit_price']))
 
-                    # First check current stock
-                    cursor = self.db.get_cursor()
-                    cursor.execute('''
-                        SELECT id, quantity, purchase_date 
-                        FROM products 
-                        WHERE product_name = ? AND quantity > 0
-                        ORDER BY purchase_date ASC
-                    ''', (product_name,))
-                    stock_records = cursor.fetchall()
-                    total_stock = sum(record['quantity'] for record in stock_records)
-
-                    logger.info(f"Current stock records for {product_name}:")
-                    for record in stock_records:
-                        logger.info(f"  ID: {record['id']}, Qty: {record['quantity']}, Date: {record['purchase_date']}")
+                # Report every shortfall at once rather than stopping at the first
+                shortfalls = []
+                for product_name, quantity in needed.items():
+                    total_stock = stock_levels.get(product_name, 0)
                     logger.info(f"Total available stock for {product_name}: {total_stock}")
-
                     if total_stock < quantity:
                         logger.error(f"Insufficient stock for {product_name}. Available: {total_stock}, Needed: {quantity}")
-                        raise ValueError(f"Insufficient stock for {product_name}")
-
-                    # Add bill item
-                    logger.info(f"Adding bill item for {product_name}...")
-                    self.db.add_bill_item(invoice_number, product_name, quantity, item['unit_price'])
-                    logger.info("Bill item added successfully")
+                        shortfalls.append(f"{product_name} (available {total_stock}, needed {quantity})")
+                if shortfalls:
+                    # Lot detail is only worth fetching when the check fails
+                    self.db.check_current_stock(
+                        (name for name, quantity in needed.items() if stock_levels.get(name, 0) < quantity),
+                        log_lots=True
+                    )
+                    raise ValueError("Insufficient stock for " + ", ".join(shortfalls))
 
-                    # Update stock
-                    logger.info(f"Updating stock for {product_name}...")
-                    self.db.update_stock(product_name, quantity)
-                    logger.info("Stock updated successfully")
+                # Save bill and its items and deduct stock in one transaction
+                logger.info("Creating bill record and updating stock in database...")
+                customer_address = self.db.create_bill(invoice_number, customer_name, total_amount, bill_date, bill_rows)
+                bill_saved = True
+                logger.info(f"Bill record created with {len(bill_rows)} item(s) for address: {customer_address}")
+                self.invalidate_product_cache()
 
                 # Show success message
                 message = f"Bill generated successfully!\nInvoice Number: {invoice_number}"
@@ -1603,6 +2321,9 @@ class StockManagementApp:
                     logger.warning(f"UI cleanup skipped: {str(e)}")
 
             except Exception as e:
+                # The whole bill rolled back, so its invoice number can be reused
+                if not bill_saved:
+                    self.db.release_invoice_number(invoice_number)
                 logger.error(f"Error during bill processing: {str(e)}", exc_info=True)
                 messagebox.showerror("Error", f"Failed to generate bill: {str(e)}")
                 raise
@@ -1611,32 +2332,6 @@ class StockManagementApp:
             logger.error(f"Error in bill generation process: {str(e)}", exc_info=True)
             messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
 
-    def real_time_inventory_search(self, event):
-        """Real-time inventory search with simple filtering"""
-        # Skip non-text keys
-        if event.keysym in ('Escape', 'Return', 'Tab', 'Up', 'Down', 'Left', 'Right'):
-            return
-
-        search_term = self.search_entry.get().strip().lower()
-
-        # Clear current items
-        for item in self.product_list.get_children():
-            self.product_list.delete(item)
-
-        # Filter products using the existing get_products method
-        all_products = self.db.get_products()
-
-        if search_term:
-            products = [p for p in all_products if any(
-                search_term in str(field).lower() for field in p
-            )]
-        else:
-            products = all_products
-
-        # Add matching products
-        for product in products:
-            self.product_list.insert("", "end", values=product)
-
     def setup_reports_tab(self):
         """Setup the reports tab with proper column formatting"""
         # Main frame
@@ -1648,12 +2343,7 @@ class StockManagementApp:
         report_frame.pack(fill=tk.X, pady=5)
 
         ttk.Label(report_frame, text="Report Type:").pack(side=tk.LEFT, padx=5)
-        self.report_type = ttk.Combobox(report_frame, values=[
-            "Stock Report", 
-            "Sales Report", 
-            "Customer Report",
-            "Product Sales Report"
-        ], state="readonly")
+        self.report_type = ttk.Combobox(report_frame, values=list(self.REPORTS), state="readonly")
         self.report_type.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.report_type.current(0)
 
@@ -1685,6 +2375,12 @@ class StockManagementApp:
         xscroll.pack(side=tk.BOTTOM, fill=tk.X)
 
         # Treeview with proper headings
+        self._report_columns = None  # column config of the report on screen
+        # Worker threads hand report rows over through this queue
+        self._report_queue = queue.Queue()
+        self._report_generation = 0
+        self._report_pending = False
+        self._report_polling = False
         self.report_tree = ttk.Treeview(
             report_display_frame,
             yscrollcommand=yscroll.set,
@@ -1706,112 +2402,91 @@ class StockManagementApp:
         from_date = self.from_date_entry.get()
         to_date = self.to_date_entry.get()
 
-        # Clear previous report
+        # Clear previous report and drop rows still coming from an earlier one
         self.report_tree.delete(*self.report_tree.get_children())
-        self.report_tree["columns"] = []
+        self._report_generation += 1
+        self._report_pending = False
 
         try:
-            cursor = self.db.get_cursor()
-
-            if report_type == "Stock Report":
-                # Configure columns
-                columns = [
-                    ("Company", 150),
-                    ("Brand", 120), 
-                    ("Product", 200),
-                    ("Quantity", 80),
-                    ("Unit Price", 100),
-                    ("CGST%", 80),
-                    ("SGST%", 80),
-                    ("Last Purchase", 120)
-                ]
-                self._setup_report_columns(columns)
-
-                # Fetch and display data
-                products = self.db.get_products()
-                for product in products:
-                    self.report_tree.insert("", "end", values=(
-                        product[0],  # Company
-                        product[1],  # Brand
-                        product[2],  # Product
-                        product[3],  # Quantity
-                        f"₹{product[4]:.2f}",  # Price
-                        f"{product[5]}%",  # CGST
-                        f"{product[6]}%",  # SGST
-                        self._format_date(product[8])  # Purchase Date
-                    ))
-
-            elif report_type == "Sales Report":
-                columns = [
-                    ("Invoice No", 100),
-                    ("Customer", 150),
-                    ("Date", 120),
-                    ("Amount", 100)
-                ]
-                self._setup_report_columns(columns)
-
-                query = "SELECT bill_number, customer_name, bill_date, total_amount FROM billing"
-                params = []
-
-                if from_date and to_date:
-                    query += " WHERE bill_date BETWEEN ? AND ?"
-                    params.extend([from_date, to_date])
-
-                cursor.execute(query, params)
-                for sale in cursor.fetchall():
-                    self.report_tree.insert("", "end", values=(
-                        sale['bill_number'],
-                        sale['customer_name'],
-                        self._format_date(sale['bill_date']),
-                        f"₹{sale['total_amount']:.2f}"
-                    ))
-
-            elif report_type == "Customer Report":
-                columns = [
-                    ("Name", 150),
-                    ("Address", 200),
-                    ("GST No", 120),
-                    ("Contact", 120)
-                ]
-                self._setup_report_columns(columns)
-
-                cursor.execute("SELECT name, address, gst_number, contact FROM customers")
-                for customer in cursor.fetchall():
-                    self.report_tree.insert("", "end", values=(
-                        customer['name'],
-                        customer['address'],
-                        customer['gst_number'],
-                        customer['contact']
-                    ))
-
-            elif report_type == "Product Sales Report":
-                columns = [
-                    ("Product", 200),
-                    ("Qty Sold", 100),
-                    ("Revenue", 120)
-                ]
-                self._setup_report_columns(columns)
+            report = self.REPORTS.get(report_type)
+            if report is None:
+                return
+            columns, query, format_row, date_column = report
+            self._setup_report_columns(columns)
 
-                cursor.execute('''
-                    SELECT product_name, SUM(quantity) as qty, 
-                           SUM(quantity*unit_price) as revenue
-                    FROM bill_items 
-                    GROUP BY product_name
-                    ORDER BY qty DESC
-                ''')
-                for item in cursor.fetchall():
-                    self.report_tree.insert("", "end", values=(
-                        item['product_name'],
-                        item['qty'],
-                        f"₹{item['revenue']:.2f}"
-                    ))
+            if query is None:
+                # Reuse the inventory rows when they are cached
+                self.insert_rows(self.report_tree, [format_row(product) for product in self._get_products_cached()])
+                return
+
+            params = ()
+            if date_column and from_date and to_date:
+                query += f" WHERE {date_column} BETWEEN ? AND ?"
+                params = (from_date, to_date)
+            self._start_report_query(query, params, format_row)
 
         except Exception as e:
             logger.error(f"Report error: {str(e)}", exc_info=True)
             messagebox.showerror("Error", f"Failed to generate report:\n{str(e)}")
 
+    def _start_report_query(self, query, params=(), format_row=None):
+        """Run a report query on a worker thread and stream its rows into report_tree"""
+        self._report_generation += 1
+        generation = self._report_generation
+        self._report_pending = True
+        self.update_status("Generating report...")
+
+        def worker():
+            try:
+                with self.db.get_read_cursor() as cursor:
+                    cursor.row_factory = None
+                    cursor.arraysize = self.REPORT_CHUNK_SIZE
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany()
+                        if not rows:
+                            break
+                        if format_row is not None:
+                            rows = [format_row(row) for row in rows]
+                        self._report_queue.put((generation, rows))
+                self._report_queue.put((generation, None))
+            except Exception as e:
+                self._report_queue.put((generation, e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        if not self._report_polling:
+            self._report_polling = True
+            self.root.after(self.REPORT_POLL_MS, self._poll_report_queue)
+
+    def _poll_report_queue(self):
+        """Insert report rows handed over by the worker; Tk is only touched from the main thread"""
+        while True:
+            try:
+                generation, chunk = self._report_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._report_generation:
+                continue  # A newer report replaced this one
+            if chunk is None:
+                self._report_pending = False
+                self.update_status("Report generated")
+            elif isinstance(chunk, Exception):
+                self._report_pending = False
+                logger.error(f"Report error: {str(chunk)}", exc_info=chunk)
+                messagebox.showerror("Error", f"Failed to generate report:\n{str(chunk)}")
+            else:
+                self.insert_rows(self.report_tree, chunk)
+        if self._report_pending:
+            self.root.after(self.REPORT_POLL_MS, self._poll_report_queue)
+        else:
+            self._report_polling = False
+
     def _setup_report_columns(self, columns):
         """Configure treeview columns consistently"""
+        # Regenerating the same report keeps its columns as they are
+        if columns == self._report_columns:
+            return
+        self._report_columns = columns
         self.report_tree["columns"] = [col[0] for col in columns]
 
         # Configure main columns
@@ -1823,13 +2498,6 @@ class StockManagementApp:
         self.report_tree.heading("#0", text="", anchor=tk.CENTER)
         self.report_tree.column("#0", width=0, stretch=False)
 
-    def _format_date(self, date_str):
-        """Format database date for display"""
-        try:
-            return datetime.strptime(date_str[:10], "%Y-%m-%d").strftime("%d-%b-%Y")
-        except:
-            return date_str or "N/A"
-    
     def add_company(self):
         """Open dialog to add a new company"""
         if self.company_window is not None and self.company_window.winfo_exists():
@@ -1989,18 +2657,19 @@ class StockManagementApp:
         gst_frame.pack(fill=tk.X, pady=5)
 
         ttk.Label(gst_frame, text="GST Slab (%):").pack(side=tk.LEFT, padx=5)
-        self.gst_slab_combobox = ttk.Combobox(gst_frame, values=self.db.get_gst_slabs())
+        gst_slabs = self.db.get_gst_slabs()
+        self.gst_slab_combobox = ttk.Combobox(gst_frame, values=gst_slabs)
         self.gst_slab_combobox.pack(side=tk.LEFT, padx=5)
-        if self.db.get_gst_slabs():
+        if gst_slabs:
             self.gst_slab_combobox.current(0)
 
+        # CGST and SGST are both half the slab, so one variable drives both labels
+        self.product_gst_half_var = tk.StringVar(value="0.0")
         ttk.Label(gst_frame, text="CGST %:").pack(side=tk.LEFT, padx=5)
-        self.cgst_label = ttk.Label(gst_frame, text="0.0", relief=tk.SUNKEN, width=8)
-        self.cgst_label.pack(side=tk.LEFT, padx=5)
+        ttk.Label(gst_frame, textvariable=self.product_gst_half_var, relief=tk.SUNKEN, width=8).pack(side=tk.LEFT, padx=5)
 
         ttk.Label(gst_frame, text="SGST %:").pack(side=tk.LEFT, padx=5)
-        self.sgst_label = ttk.Label(gst_frame, text="0.0", relief=tk.SUNKEN, width=8)
-        self.sgst_label.pack(side=tk.LEFT, padx=5)
+        ttk.Label(gst_frame, textvariable=self.product_gst_half_var, relief=tk.SUNKEN, width=8).pack(side=tk.LEFT, padx=5)
 
         ttk.Label(gst_frame, text="CESS %:").pack(side=tk.LEFT, padx=5)
         self.cess_entry = ttk.Entry(gst_frame, width=8)
@@ -2093,25 +2762,26 @@ class StockManagementApp:
         self.gst_slab_combobox.bind("<KeyRelease>", self.update_product_gst_rates)
 
         # Initialize GST rates
+        self._current_gst = None
         self.update_product_gst_rates()
 
         # List to store products before saving
         self.product_items = []
+        # Running [subtotal, cgst, sgst, cess] of product_items, kept up to date as items are added
+        self.product_totals = [0.0, 0.0, 0.0, 0.0]
+
+    def _accumulate_product_totals(self, item):
+        """Add one product item's value and taxes to the running totals"""
+        item_value = item['quantity'] * item['unit_price']
+        totals = self.product_totals
+        totals[0] += item_value
+        totals[1] += item_value * (item['cgst'] / 100)
+        totals[2] += item_value * (item['sgst'] / 100)
+        totals[3] += item_value * (item['cess'] / 100)
     
     def update_product_totals(self):
         """Update product totals based on items in the list"""
-        subtotal = 0.0
-        total_cgst = 0.0
-        total_sgst = 0.0
-        total_cess = 0.0
-
-        for item in self.product_items:
-            item_value = item['quantity'] * item['unit_price']
-            subtotal += item_value
-            total_cgst += item_value * (item['cgst'] / 100)
-            total_sgst += item_value * (item['sgst'] / 100)
-            total_cess += item_value * (item['cess'] / 100)
-
+        subtotal, total_cgst, total_sgst, total_cess = self.product_totals
         total = subtotal + total_cgst + total_sgst + total_cess
 
         # Update labels
@@ -2123,14 +2793,14 @@ class StockManagementApp:
 
     def update_product_gst_rates(self, event=None):
         """Update CGST and SGST labels when GST slab changes"""
-        try:
-            gst_slab = float(self.gst_slab_combobox.get())
-            cgst = gst_slab / 2
-            sgst = gst_slab / 2
-            self.cgst_label.config(text=f"{cgst:.2f}")
-            self.sgst_label.config(text=f"{sgst:.2f}")
-        except ValueError:
-            pass
+        rates = split_gst_slab(self.gst_slab_combobox.get())
+        if rates is None:
+            self._current_gst = None
+            return
+        half, half_text = rates
+        self.product_gst_half_var.set(half_text)
+        # Parsed once per slab change so adding items doesn't parse it again
+        self._current_gst = (half, half)
 
     def add_product_to_list(self):
         """Add product to the items list"""
@@ -2152,9 +2822,9 @@ class StockManagementApp:
             cess = float(cess) if cess else 0.0
 
             # Get GST rates
-            gst_slab = float(self.gst_slab_combobox.get())
-            cgst = gst_slab / 2
-            sgst = gst_slab / 2
+            if self._current_gst is None:
+                raise ValueError("invalid GST slab")
+            cgst, sgst = self._current_gst
 
             # Calculate item total
             item_total = (price * quantity) * (1 + (cgst + sgst + cess) / 100)
@@ -2173,7 +2843,7 @@ class StockManagementApp:
             ))
 
             # Add to temporary list for later processing
-            self.product_items.append({
+            item = {
                 'company': company,
                 'brand': brand,
                 'product_name': product_name,
@@ -2183,7 +2853,9 @@ class StockManagementApp:
                 'sgst': sgst,
                 'cess': cess,
                 'company_invoice': company_invoice
-            })
+            }
+            self.product_items.append(item)
+            self._accumulate_product_totals(item)
 
             # Update totals
             self.update_product_totals()
@@ -2203,6 +2875,8 @@ class StockManagementApp:
         """Clear all items from product list"""
         self.product_items_tree.delete(*self.product_items_tree.get_children())
         self.product_items.clear()
+        self.product_totals = [0.0, 0.0, 0.0, 0.0]
+        self.update_product_totals()
 
     def save_all_products(self):
         """Save all products in the list to database"""
@@ -2213,15 +2887,18 @@ class StockManagementApp:
         companies = self.db.get_companies()
         purchase_date = datetime.now().strftime("%Y-%m-%d")
 
+        # Validate every company up front so nothing is half-saved
+        missing = sorted({p['company'] for p in self.product_items if p['company'] not in companies})
+        if missing:
+            names = ", ".join(f"'{name}'" for name in missing)
+            messagebox.showerror("Error", f"Company {names} not found")
+            return
+
         try:
+            rows = []
             for product in self.product_items:
-                company_id = companies.get(product['company'])
-                if not company_id:
-                    messagebox.showerror("Error", f"Company '{product['company']}' not found")
-                    return
-
-                self.db.add_product(
-                    company_id,
+                rows.append((
+                    companies[product['company']],
                     product['brand'],
                     product['product_name'],
                     product['quantity'],
@@ -2231,7 +2908,12 @@ class StockManagementApp:
                     product['cess'],
                     purchase_date,
                     product['company_invoice']
-                )
+                ))
+
+            self.db.add_products_bulk(rows)
+            # One write-back per saved batch rather than per insert
+            self.db.persist_fast_import()
+            self.invalidate_product_cache()
 
             messagebox.showinfo("Success", f"{len(self.product_items)} product(s) added successfully")
             self.load_products()  # Refresh product list
@@ -2243,84 +2925,6 @@ class StockManagementApp:
             logger.error(f"Error adding products: {e}")
             messagebox.showerror("Error", f"Failed to add products: {str(e)}")
 
-    def add_product_entry(self, parent_frame, companies, gst_slabs):
-        """Add a set of product entry fields"""
-        entry_frame = ttk.Frame(parent_frame, borderwidth=1, relief="solid", padding=10)
-        entry_frame.pack(fill=tk.X, pady=5, padx=5)
-
-        # Product details
-        ttk.Label(entry_frame, text="Brand:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-        brand_entry = ttk.Entry(entry_frame)
-        brand_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-        ttk.Label(entry_frame, text="Product Name:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-        product_entry = ttk.Entry(entry_frame)
-        product_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-        ttk.Label(entry_frame, text="Quantity:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-        qty_entry = ttk.Entry(entry_frame)
-        qty_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-        ttk.Label(entry_frame, text="Unit Price:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
-        price_entry = ttk.Entry(entry_frame)
-        price_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
-
-        # GST slab selection
-        ttk.Label(entry_frame, text="GST Slab (%):").grid(row=4, column=0, padx=5, pady=5, sticky="e")
-        gst_slab_combobox = ttk.Combobox(entry_frame, values=gst_slabs)
-        gst_slab_combobox.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
-        if gst_slabs:
-            gst_slab_combobox.current(0)
-
-        # CGST (auto-calculated as half of GST slab)
-        ttk.Label(entry_frame, text="CGST %:").grid(row=5, column=0, padx=5, pady=5, sticky="e")
-        cgst_label = ttk.Label(entry_frame, text="0.0", relief=tk.SUNKEN)
-        cgst_label.grid(row=5, column=1, padx=5, pady=5, sticky="ew")
-
-        # SGST (auto-calculated as half of GST slab)
-        ttk.Label(entry_frame, text="SGST %:").grid(row=6, column=0, padx=5, pady=5, sticky="e")
-        sgst_label = ttk.Label(entry_frame, text="0.0", relief=tk.SUNKEN)
-        sgst_label.grid(row=6, column=1, padx=5, pady=5, sticky="ew")
-
-        # CESS (default to 0)
-        ttk.Label(entry_frame, text="CESS %:").grid(row=7, column=0, padx=5, pady=5, sticky="e")
-        cess_entry = ttk.Entry(entry_frame)
-        cess_entry.insert(0, "0.0")  # Default value
-        cess_entry.grid(row=7, column=1, padx=5, pady=5, sticky="ew")
-
-        # Update CGST and SGST when GST slab changes
-        def update_gst_rates(event=None):
-            try:
-                gst_slab = float(gst_slab_combobox.get())
-                cgst = gst_slab / 2
-                sgst = gst_slab / 2
-                cgst_label.config(text=f"{cgst:.2f}")
-                sgst_label.config(text=f"{sgst:.2f}")
-            except ValueError:
-                pass
-
-        gst_slab_combobox.bind("<<ComboboxSelected>>", update_gst_rates)
-        gst_slab_combobox.bind("<KeyRelease>", update_gst_rates)
-
-        # Initialize GST rates
-        update_gst_rates()
-
-        # Store references to all entries
-        if not hasattr(entry_frame, 'product_entries'):
-            entry_frame.product_entries = []
-
-        entry_frame.product_entries.append({
-            'brand_entry': brand_entry,
-            'product_entry': product_entry,
-            'qty_entry': qty_entry,
-            'price_entry': price_entry,
-            'gst_slab_combobox': gst_slab_combobox,
-            'cgst_label': cgst_label,
-            'sgst_label': sgst_label,
-            'cess_entry': cess_entry
-        })
-
-    
     def add_gst_slab(self):
         """Add a new GST slab rate"""
         rate = simpledialog.askfloat("Add GST Slab", "Enter GST rate (%):", parent=self.root)
@@ -2332,6 +2936,144 @@ class StockManagementApp:
                 logger.error(f"Error adding GST slab: {e}")
                 messagebox.showerror("Error", f"Failed to add GST slab: {str(e)}")
     
+    def _build_tree(self, parent, columns, paged=False):
+        """Create a headings-only Treeview with scrollbars in parent from (name, width, anchor) columns"""
+        container = ttk.Frame(parent)
+        container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        yscroll = ttk.Scrollbar(container, orient=tk.VERTICAL)
+        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        xscroll = ttk.Scrollbar(container, orient=tk.HORIZONTAL)
+        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+
+        tree = ttk.Treeview(
+            container,
+            columns=[column[0] for column in columns],
+            show='headings',
+            yscrollcommand=yscroll.set,
+            xscrollcommand=xscroll.set
+        )
+        yscroll.config(command=tree.yview)
+        xscroll.config(command=tree.xview)
+        if paged:
+            self._bind_paged_scroll(tree, yscroll)
+
+        self.root.tk.call('stashboard_setup_columns', str(tree), columns)
+
+        tree.pack(fill=tk.BOTH, expand=True)
+        return tree
+
+    def insert_rows(self, tree, rows):
+        """Append rows (tuples of display values) to tree in a single Tcl call"""
+        if rows:
+            self.root.tk.call('stashboard_insert_rows', str(tree), tuple(rows))
+
+    def _bind_paged_scroll(self, tree, scrollbar):
+        """Drive scrollbar from tree and pull in the next page of rows as tree nears its end"""
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            page = self._tree_pages.get(tree)
+            if page is not None and not page[2] and float(last) >= self.TREE_PAGE_PREFETCH:
+                page[2] = True
+                self.root.after_idle(self._insert_next_page, tree)
+
+        def on_destroy(event):
+            # Closing the window must not leave the dead tree's pending rows or load behind
+            self._tree_pages.pop(tree, None)
+            self._tree_loads.pop(tree, None)
+
+        tree.configure(yscrollcommand=on_scroll)
+        tree.bind("<Destroy>", on_destroy, add="+")
+
+    def _fill_tree_paged(self, tree, rows):
+        """Replace tree's rows, inserting one page now and the rest as it is scrolled"""
+        tree.delete(*tree.get_children())
+        # [rows, index of the next row to insert, page insert scheduled]
+        self._tree_pages[tree] = [rows, 0, False]
+        self._insert_next_page(tree)
+
+    def _load_tree_async(self, tree, query, params=()):
+        """Run a display query on a worker thread and page its rows into tree as they arrive"""
+        token = object()
+        # [load token, rows received so far]
+        self._tree_loads[tree] = [token, []]
+
+        def worker():
+            try:
+                with self.db.get_read_cursor() as cursor:
+                    cursor.row_factory = None
+                    cursor.execute(query, params)
+                    while self._tree_loads.get(tree, (None,))[0] is token:
+                        rows = cursor.fetchmany(self.TREE_PAGE_SIZE)
+                        self._tree_load_queue.put((tree, token, rows))
+                        if not rows:
+                            break
+            except Exception as e:
+                self._tree_load_queue.put((tree, token, e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        if not self._tree_load_polling:
+            self._tree_load_polling = True
+            self.root.after(self.TREE_LOAD_POLL_MS, self._poll_tree_loads)
+
+    def _poll_tree_loads(self):
+        """Page rows handed over by tree load workers into their trees; Tk is only touched from the main thread"""
+        while True:
+            try:
+                tree, token, chunk = self._tree_load_queue.get_nowait()
+            except queue.Empty:
+                break
+            load = self._tree_loads.get(tree)
+            if load is None or load[0] is not token:
+                continue  # A newer load replaced this one
+            if not tree.winfo_exists():
+                del self._tree_loads[tree]
+            elif isinstance(chunk, Exception):
+                del self._tree_loads[tree]
+                logger.error(f"Error loading records: {str(chunk)}", exc_info=chunk)
+                messagebox.showerror("Error", f"Failed to load records:\n{str(chunk)}")
+            elif not chunk:
+                del self._tree_loads[tree]
+                if not load[1]:
+                    self._fill_tree_paged(tree, load[1])
+            else:
+                self._append_tree_rows(tree, load[1], chunk)
+        if self._tree_loads:
+            self.root.after(self.TREE_LOAD_POLL_MS, self._poll_tree_loads)
+        else:
+            self._tree_load_polling = False
+
+    def _append_tree_rows(self, tree, rows, chunk):
+        """Add a fetched chunk to a tree's pending rows, inserting it now if the tree is showing its end"""
+        received = len(rows)
+        rows.extend(chunk)
+        if not received:
+            # The first chunk replaces the rows of the previous load
+            self._fill_tree_paged(tree, rows)
+        elif tree not in self._tree_pages:
+            # Every earlier row is in the tree already, so continue from this chunk
+            self._tree_pages[tree] = [rows, received, False]
+            if float(tree.yview()[1]) >= self.TREE_PAGE_PREFETCH:
+                self._insert_next_page(tree)
+
+    def _insert_next_page(self, tree):
+        """Insert the next TREE_PAGE_SIZE pending rows of tree"""
+        page = self._tree_pages.get(tree)
+        if page is None:
+            return
+        if not tree.winfo_exists():
+            del self._tree_pages[tree]
+            return
+        rows, start, _ = page
+        end = start + self.TREE_PAGE_SIZE
+        self.insert_rows(tree, rows[start:end])
+        if end >= len(rows):
+            del self._tree_pages[tree]
+        else:
+            page[1] = end
+            page[2] = False
+
     # Enhance the purchases window to show invoices:
     def open_purchases_window(self):
         """Open window to view purchase history with enhanced filtering"""
@@ -2343,236 +3085,80 @@ class StockManagementApp:
         self.purchases_window.title("Purchase History")
         self.purchases_window.geometry("1200x600")
     
-        # Filter frame with type selection
+        # Filter frame; its inputs are only built when first asked for
         filter_frame = ttk.Frame(self.purchases_window)
         filter_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        ttk.Label(filter_frame, text="Filter Type:").pack(side=tk.LEFT, padx=5)
-        self.filter_type_combobox = ttk.Combobox(filter_frame, 
-                                               values=["All", "Product", "Company", "Invoice"],
-                                               state="readonly", width=10)
-        self.filter_type_combobox.pack(side=tk.LEFT, padx=5)
-        self.filter_type_combobox.current(0)  # Default to "All"
-        
-        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT, padx=5)
-        self.purchase_filter_entry = ttk.Entry(filter_frame)
-        self.purchase_filter_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        # Filter inputs are read through their variables, which exist before the widgets do
+        self.filter_type_var = tk.StringVar(value="All")
+        self.purchase_filter_var = tk.StringVar()
         
-        ttk.Button(filter_frame, text="Apply Filter", command=self.refresh_purchases_view).pack(side=tk.LEFT, padx=5)
+        show_filter_button = ttk.Button(filter_frame, text="Show filter ▾")
+        show_filter_button.configure(command=lambda: self._build_purchase_filter_row(filter_frame, show_filter_button))
+        show_filter_button.pack(side=tk.LEFT, padx=5)
     
         # Treeview with scrollbars
-        tree_frame = ttk.Frame(self.purchases_window)
-        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    
-        yscroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
-        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
-    
-        xscroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
-        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
-    
-        self.purchases_tree = ttk.Treeview(
-            tree_frame,
-            columns=("ID", "Company", "Brand", "Product", "Original", "Remaining", "Sold", "Price", "Purchase Date", "Invoice"),
-            show='headings',
-            yscrollcommand=yscroll.set,
-            xscrollcommand=xscroll.set
-        )
-    
-        # Configure scrollbars
-        yscroll.config(command=self.purchases_tree.yview)
-        xscroll.config(command=self.purchases_tree.xview)
-    
-        # Configure columns
-        columns = [
-            ("ID", 50),
-            ("Company", 150),
-            ("Brand", 100),
-            ("Product", 150),
-            ("Original", 80),
-            ("Remaining", 80),
-            ("Sold", 80),
-            ("Price", 80),
-            ("Purchase Date", 120),
-            ("Invoice", 120)
-        ]
-    
-        for col, width in columns:
-            self.purchases_tree.heading(col, text=col)
-            self.purchases_tree.column(col, width=width, anchor=tk.CENTER)
-    
-        self.purchases_tree.pack(fill=tk.BOTH, expand=True)
+        self.purchases_tree = self._build_tree(self.purchases_window, self.PURCHASE_COLUMNS, paged=True)
     
         # Load initial data
         self.refresh_purchases_view()
     
-    def refresh_purchases_view(self):
-        """Refresh the purchases treeview with applied filters"""
-        filter_type = self.filter_type_combobox.get()
-        filter_value = self.purchase_filter_entry.get().strip()
-        
-        # Build SQL query based on filter type
-        cursor = self.db.get_cursor()
-        query = '''
-            SELECT 
-                p.id,
-                c.name as company_name,
-                p.brand,
-                p.product_name,
-                p.original_quantity,
-                p.quantity as remaining_quantity,
-                p.unit_price,
-                p.cgst,
-                p.sgst,
-                p.cess,
-                p.purchase_date,
-                p.company_invoice,
-                (p.original_quantity - p.quantity) as sold_quantity
-            FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
-        '''
-        
-        params = []
+    def _build_purchase_filter_row(self, filter_frame, show_filter_button):
+        """Replace the "Show filter" button with the purchase filter inputs"""
+        show_filter_button.destroy()
+
+        ttk.Label(filter_frame, text="Filter Type:").pack(side=tk.LEFT, padx=5)
+        self.filter_type_combobox = ttk.Combobox(filter_frame, textvariable=self.filter_type_var,
+                                               values=["All", "Product", "Company", "Invoice"],
+                                               state="readonly", width=10)
+        self.filter_type_combobox.pack(side=tk.LEFT, padx=5)
+        self.filter_type_combobox.bind(
+            "<<ComboboxSelected>>",
+            lambda event: self.schedule_purchases_refresh(self.PURCHASE_FILTER_TYPE_DELAY_MS)
+        )
         
-        if filter_value:
-            if filter_type == "Product":
-                query += " WHERE p.product_name LIKE ?"
-                params.append(f"%{filter_value}%")
-            elif filter_type == "Company":
-                query += " WHERE c.name LIKE ?"
-                params.append(f"%{filter_value}%")
-            elif filter_type == "Invoice":
-                query += " WHERE p.company_invoice LIKE ?"
-                params.append(f"%{filter_value}%")
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT, padx=5)
+        self.purchase_filter_entry = ttk.Entry(filter_frame, textvariable=self.purchase_filter_var)
+        self.purchase_filter_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.purchase_filter_entry.bind("<KeyRelease>", self.on_purchase_filter_key)
+        self.purchase_filter_entry.focus_set()
         
-        query += " ORDER BY p.purchase_date DESC"
-        cursor.execute(query, params)
-        purchases = cursor.fetchall()
-    
-        # Clear current items
-        for item in self.purchases_tree.get_children():
-            self.purchases_tree.delete(item)
-    
-        # Add filtered purchases
-        for purchase in purchases:
-            self.purchases_tree.insert("", "end", values=(
-                purchase['id'],
-                purchase['company_name'],
-                purchase['brand'],
-                purchase['product_name'],
-                purchase['original_quantity'],
-                purchase['remaining_quantity'],
-                purchase['sold_quantity'],
-                f"{purchase['unit_price']:.2f}",
-                purchase['purchase_date'],
-                purchase['company_invoice'] or ""
-            ))
-    
-    def on_invoice_selected(self, event):
-        """Load items for selected invoice"""
-        selected = self.invoices_tree.selection()
-        if not selected:
+        ttk.Button(filter_frame, text="Apply Filter", command=self.refresh_purchases_view).pack(side=tk.LEFT, padx=5)
+
+    def on_purchase_filter_key(self, event):
+        """Refresh the purchases view once typing in the filter pauses"""
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        if self.purchase_filter_var.get().strip() == self._last_purchase_filter:
             return
+        self.schedule_purchases_refresh(self.PURCHASE_FILTER_DEBOUNCE_MS)
 
-        invoice_no = self.invoices_tree.item(selected[0], "values")[0]
+    def schedule_purchases_refresh(self, delay):
+        """Run refresh_purchases_view after delay ms, replacing any refresh still pending"""
+        if self._purchase_filter_after_id is not None:
+            self.root.after_cancel(self._purchase_filter_after_id)
+        self._purchase_filter_after_id = self.root.after(delay, self._do_purchases_refresh)
 
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT 
-                p.company_invoice as invoice_no,
-                p.product_name,
-                p.brand,
-                p.quantity,
-                p.unit_price,
-                (p.quantity * p.unit_price) as total
-            FROM products p
-            WHERE p.company_invoice = ?
-            ORDER BY p.product_name
-        ''', (invoice_no,))
-
-        items = cursor.fetchall()
-
-        # Clear current items
-        for item in self.purchase_items_tree.get_children():
-            self.purchase_items_tree.delete(item)
-
-        # Add new items
-        for item in items:
-            self.purchase_items_tree.insert("", "end", values=(
-                item['invoice_no'],
-                item['product_name'],
-                item['brand'],
-                item['quantity'],
-                f"{item['unit_price']:.2f}",
-                f"{item['total']:.2f}"
-            ))
+    def _do_purchases_refresh(self):
+        """Run the debounced purchases refresh if the window is still open"""
+        self._purchase_filter_after_id = None
+        if self.purchases_window.winfo_exists():
+            self.refresh_purchases_view()
 
-    def load_invoices(self):
-        """Load invoices into the treeview"""
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT 
-                p.company_invoice as invoice_no,
-                c.name as company,
-                p.purchase_date as date,
-                p.product_name,
-                p.brand,
-                p.quantity,
-                p.unit_price,
-                (p.quantity * p.unit_price) as total_value
-            FROM products p
-            LEFT JOIN companies c ON p.company_id = c.id
-            WHERE p.company_invoice IS NOT NULL AND p.company_invoice != ''
-            ORDER BY p.purchase_date DESC, p.company_invoice
-        ''')
-        purchases = cursor.fetchall()
-
-        # Clear current items
-        for item in self.invoices_tree.get_children():
-            self.invoices_tree.delete(item)
-
-        # Organize by invoice
-        invoice_dict = {}
-        for purchase in purchases:
-            invoice_no = purchase['invoice_no']
-            if invoice_no not in invoice_dict:
-                invoice_dict[invoice_no] = {
-                    'company': purchase['company'],
-                    'date': purchase['date'],
-                    'items': [],
-                    'total_value': 0
-                }
-            invoice_dict[invoice_no]['items'].append(purchase)
-            invoice_dict[invoice_no]['total_value'] += purchase['total_value']
+    def refresh_purchases_view(self):
+        """Refresh the purchases treeview with applied filters"""
+        filter_type = self.filter_type_var.get()
+        filter_value = self.purchase_filter_var.get().strip()
+        self._last_purchase_filter = filter_value
+        
+        # Pick the query for the filter type; it selects the displayed values in column order
+        if filter_value and filter_type != "All" and filter_type in PURCHASE_FILTER_SQL:
+            query, params = PURCHASE_FILTER_SQL[filter_type], (f"%{filter_value}%",)
+        else:
+            query, params = PURCHASE_FILTER_SQL["All"], ()
 
-        # Add to treeview
-        for invoice_no, data in invoice_dict.items():
-            self.invoices_tree.insert("", "end", values=(
-                invoice_no,
-                data['company'],
-                data['date'],
-                len(data['items']),  # Total items
-                f"{data['total_value']:.2f}"  # Total value
-            ))
-    
-    def load_purchases(self):
-        """Load purchases into the treeview"""
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT * FROM purchases ORDER BY purchase_date DESC")
-        purchases = cursor.fetchall()
-        
-        for item in self.purchases_tree.get_children():
-            self.purchases_tree.delete(item)
-        
-        for purchase in purchases:
-            self.purchases_tree.insert("", "end", values=(
-                purchase['id'],
-                purchase['transaction_id'],
-                purchase['product_name'],
-                purchase['quantity'],
-                f"{purchase['unit_price']:.2f}",
-                f"{purchase['total_price']:.2f}",
-                purchase['purchase_date']
-            ))
+        # Only the rows scrolled into view get inserted
+        self._load_tree_async(self.purchases_tree, query, params)
     
     def open_bills_window(self):
         """Open window to view bills"""
@@ -2597,72 +3183,17 @@ class StockManagementApp:
         notebook.add(items_tab, text="Items")
         
         # Setup bills treeview
-        bills_container = ttk.Frame(bills_tab)
-        bills_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        yscroll = ttk.Scrollbar(bills_container, orient=tk.VERTICAL)
-        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        xscroll = ttk.Scrollbar(bills_container, orient=tk.HORIZONTAL)
-        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        self.bills_tree = ttk.Treeview(
-            bills_container,
-            columns=("Bill No", "Customer", "Amount", "Date"),
-            show='headings',
-            yscrollcommand=yscroll.set,
-            xscrollcommand=xscroll.set
-        )
-        
-        yscroll.config(command=self.bills_tree.yview)
-        xscroll.config(command=self.bills_tree.xview)
-        
-        self.bills_tree.heading("Bill No", text="Bill No")
-        self.bills_tree.heading("Customer", text="Customer")
-        self.bills_tree.heading("Amount", text="Amount")
-        self.bills_tree.heading("Date", text="Date")
-        
-        self.bills_tree.column("Bill No", width=100, anchor=tk.CENTER)
-        self.bills_tree.column("Customer", width=200, anchor=tk.W)
-        self.bills_tree.column("Amount", width=100, anchor=tk.E)
-        self.bills_tree.column("Date", width=150, anchor=tk.CENTER)
-        
-        self.bills_tree.pack(fill=tk.BOTH, expand=True)
-        
-        # Setup bill items treeview
-        items_container = ttk.Frame(items_tab)
-        items_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        yscroll = ttk.Scrollbar(items_container, orient=tk.VERTICAL)
-        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        xscroll = ttk.Scrollbar(items_container, orient=tk.HORIZONTAL)
-        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        self.bill_items_tree = ttk.Treeview(
-            items_container,
-            columns=("Bill No", "Product", "Qty", "Price", "Total"),
-            show='headings',
-            yscrollcommand=yscroll.set,
-            xscrollcommand=xscroll.set
-        )
+        self.bills_tree = self._build_tree(bills_tab, self.BILL_COLUMNS, paged=True)
         
-        yscroll.config(command=self.bill_items_tree.yview)
-        xscroll.config(command=self.bill_items_tree.xview)
+        # The items tree is only built once its tab is first shown
+        self.bill_items_tree = None
         
-        self.bill_items_tree.heading("Bill No", text="Bill No")
-        self.bill_items_tree.heading("Product", text="Product")
-        self.bill_items_tree.heading("Qty", text="Qty")
-        self.bill_items_tree.heading("Price", text="Price")
-        self.bill_items_tree.heading("Total", text="Total")
+        def on_tab_changed(event):
+            if self.bill_items_tree is None and notebook.select() == str(items_tab):
+                self.bill_items_tree = self._build_tree(items_tab, self.BILL_ITEM_COLUMNS)
+                self.on_bill_selected()
         
-        self.bill_items_tree.column("Bill No", width=100, anchor=tk.CENTER)
-        self.bill_items_tree.column("Product", width=200, anchor=tk.W)
-        self.bill_items_tree.column("Qty", width=50, anchor=tk.CENTER)
-        self.bill_items_tree.column("Price", width=100, anchor=tk.E)
-        self.bill_items_tree.column("Total", width=100, anchor=tk.E)
-        
-        self.bill_items_tree.pack(fill=tk.BOTH, expand=True)
+        notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
         
         # Load data
         self.load_bills()
@@ -2672,57 +3203,48 @@ class StockManagementApp:
     
     def load_bills(self):
         """Load bills into the treeview"""
-        cursor = self.db.get_cursor()
-        cursor.execute("SELECT * FROM billing ORDER BY bill_date DESC")
-        bills = cursor.fetchall()
-        
-        for item in self.bills_tree.get_children():
-            self.bills_tree.delete(item)
-        
-        for bill in bills:
-            self.bills_tree.insert("", "end", values=(
-                bill['bill_number'],
-                bill['customer_name'],
-                f"{bill['total_amount']:.2f}",
-                bill['bill_date']
-            ))
+        # Select exactly the displayed columns so each plain tuple row goes straight to the tree
+        self._load_tree_async(self.bills_tree, '''
+            SELECT bill_number, customer_name, printf('%.2f', total_amount), bill_date
+            FROM billing
+            ORDER BY bill_date DESC
+        ''')
     
-    def on_bill_selected(self, event):
+    def on_bill_selected(self, event=None):
         """Load items for selected bill"""
         selected = self.bills_tree.selection()
-        if not selected:
+        if not selected or self.bill_items_tree is None:
             return
         
         bill_number = self.bills_tree.item(selected[0], "values")[0]
+        # Saved bills never change, so the last bill's items can be shown again as they are
+        if self._last_bill_items is not None and self._last_bill_items[0] == bill_number:
+            items = self._last_bill_items[1]
+        else:
+            items = self._fetch_bill_items(bill_number)
+            self._last_bill_items = (bill_number, items)
         
-        cursor = self.db.get_cursor()
-        cursor.execute('''
-            SELECT bill_number, product_name, quantity, unit_price, 
-                   (quantity * unit_price) as total
-            FROM bill_items
-            WHERE bill_number = ?
-        ''', (bill_number,))
-        
-        items = cursor.fetchall()
-        
-        # Clear current items
-        for item in self.bill_items_tree.get_children():
-            self.bill_items_tree.delete(item)
-        
-        # Add new items
-        for item in items:
-            self.bill_items_tree.insert("", "end", values=(
-                item['bill_number'],
-                item['product_name'],
-                item['quantity'],
-                f"{item['unit_price']:.2f}",
-                f"{item['total']:.2f}"
-            ))
+        # Replace the items in one call
+        self.bill_items_tree.delete(*self.bill_items_tree.get_children())
+        self.insert_rows(self.bill_items_tree, items)
+    
+    def _fetch_bill_items(self, bill_number):
+        """Query the display rows of one bill's items"""
+        with self.db.get_read_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute('''
+                SELECT bill_number, product_name, quantity, printf('%.2f', unit_price), 
+                       printf('%.2f', quantity * unit_price) as total
+                FROM bill_items
+                WHERE bill_number = ?
+            ''', (bill_number,))
+            return cursor.fetchall()
     
     def reset_application_state(self):
         """Reset application state by clearing temporary data"""
         self.added_items.clear()
         self.temp_products.clear()
+        self.invalidate_product_cache()
         self.total_cgst = 0.0
         self.total_sgst = 0.0
         
@@ -2742,9 +3264,16 @@ class StockManagementApp:
 
 # Main function
 def main():
+    global FAST_IMPORT
+    parser = argparse.ArgumentParser(description="Stock management")
+    parser.add_argument('--fast-import', action='store_true',
+                        help="work on a tmpfs copy of the database and write it back after imports and on exit")
+    FAST_IMPORT = parser.parse_args().fast_import
+
     root = tk.Tk()
     app = StockManagementApp(root)
     root.mainloop()
+    app.db.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file